@@ -1,5 +1,6 @@
 import matplotlib.pyplot as plt
 import numpy as np
+from numba import njit
 
 def iterate(x, mu):
     return 1 - mu * x ** 2
@@ -31,32 +32,75 @@ def plot_x_n(num=100, extend=False):
     # plt.savefig("x_n.png")
     plt.show()
 
+@njit(cache=True)
+def _accumulate(hist, x, lo, scale):
+    '''bin one iterate of every pair, hist[row, int((x - lo) * scale)] += 1'''
+    bins = hist.shape[1]
+    for i in range(x.shape[0]):
+        for j in range(x.shape[1]):
+            pos = (x[i, j] - lo) * scale
+            if pos >= 0 and pos < bins:
+                hist[i, int(pos)] += 1
+
+def bifurcation(mu, x0, n_iter=1000, transient=200, bins=1000, x_range=(-1.1, 1.1), extend=False):
+    '''density of the orbit tails, shape (len of the first axis, bins)
+
+    mu and x0 broadcast together and every pair is iterated at once;
+    the first transient iterates are dropped and the remaining ones are
+    binned over x_range as they are made, summed over all but the first
+    axis. Only the current iterate and the histogram are held, whatever
+    n_iter is. Diverging orbits are not counted.
+    '''
+    mu, x = np.broadcast_arrays(np.asarray(mu, dtype=np.float64), np.asarray(x0, dtype=np.float64))
+    rows = mu.shape[0] if mu.ndim else 1
+    mu = mu.reshape(rows, -1)
+    x = x.reshape(rows, -1).copy()
+    step = iterate2 if extend else iterate
+    lo, hi = x_range
+    hist = np.zeros((rows, bins), dtype=np.int64)
+
+    with np.errstate(over='ignore', invalid='ignore'):
+        for i in range(n_iter):
+            x = step(x, mu)
+            if i >= transient:
+                _accumulate(hist, x, lo, bins / (hi - lo))
+    return hist
+
+def _density(ax, hist, extent):
+    '''log scaled density image of a bifurcation histogram, rows along the x axis'''
+    ax.imshow(np.log1p(hist.T), origin="lower", extent=extent, aspect="auto", cmap="binary")
+
 def plot_mu_x(extend=False):
     fig, ax = plt.subplots(3, 2, figsize=(15, 15))
     fig.tight_layout(pad=5.0)
     plt.rcParams['font.size'] = 14
-    mu_array = np.linspace(-0.5,2,500)
+    mu_array = np.linspace(-0.5,2,2000)
     x0_array = [0.1, 0.3, 0.5, 0.7, 0.9, 1]
 
     for (i, x0) in enumerate(x0_array):
-        show_x_array = []
-        show_y_array = []
-        for mu in mu_array:
-            array = generate_array(x0, mu, 200, extend=extend)
-            show_x_array.extend([mu for i in range(200)])
-            show_y_array.extend(array)
-            
-        ax[i//2, i%2].scatter(show_x_array, show_y_array, s=0.2, label=f"x0={x0:.2f}")
+        hist = bifurcation(mu_array, x0, 200, 0, bins=1000, extend=extend)
+        _density(ax[i//2, i%2], hist, (-0.5, 2, -1.1, 1.1))
         ax[i//2, i%2].set_xlabel("$\mu$")
         ax[i//2, i%2].set_ylabel("$x$")
-        ax[i//2, i%2].set_xlim((-0.5,2))
-        ax[i//2, i%2].set_ylim((-1.1,1.1))
         ax[i//2, i%2].set_title(f"x0={x0:.2f}")
         ax[i//2, i%2].grid()
 
     # plt.savefig("mu_x_new.png")
     plt.show()
 
+def plot_bifurcation(extend=False, n_mu=10**4, n_iter=10**4, transient=1000, bins=2000):
+    '''one diagram over n_mu values of mu and all the x0 of plot_mu_x, transient dropped'''
+    mu_array = np.linspace(-0.5, 2, n_mu)
+    x0_array = np.array([0.1, 0.3, 0.5, 0.7, 0.9, 1])
+    hist = bifurcation(mu_array[:, None], x0_array, n_iter, transient, bins, extend=extend)
+    fig, ax = plt.subplots(figsize=(15, 10))
+    plt.rcParams['font.size'] = 14
+    _density(ax, hist, (-0.5, 2, -1.1, 1.1))
+    ax.set_xlabel("$\mu$")
+    ax.set_ylabel("$x$")
+    # plt.savefig("bifurcation.png")
+    plt.show()
+
 def plot_x0_x(extend=False):
     fig, ax = plt.subplots(2, 2, figsize=(15, 15))
     fig.tight_layout(pad=5.0)
@@ -65,18 +109,10 @@ def plot_x0_x(extend=False):
     mu_array = [0.5, 0.8, 1.4, 1.8]
 
     for (i, mu) in enumerate(mu_array):
-        show_x_array = []
-        show_y_array = []
-        for x0 in x0_array:
-            array = generate_array(x0, mu, 200, extend=extend)
-            show_x_array.extend([x0 for i in range(200)])
-            show_y_array.extend(array)
-            
-        ax[i//2, i%2].scatter(show_x_array, show_y_array, s=0.2, label=f"mu={mu:.2f}")
+        hist = bifurcation(mu, x0_array, 200, 0, bins=500, x_range=(0, 1), extend=extend)
+        _density(ax[i//2, i%2], hist, (0, 1, 0, 1))
         ax[i//2, i%2].set_xlabel("$x_0$")
         ax[i//2, i%2].set_ylabel("$x$")
-        ax[i//2, i%2].set_xlim((0,1))
-        ax[i//2, i%2].set_ylim((0,1))
         ax[i//2, i%2].set_title(f"mu={mu:.2f}")
         ax[i//2, i%2].grid()
     
@@ -0,0 +1,201 @@
+import matplotlib.pyplot as plt
+import numpy as np
+
+from logestic import iterate, iterate2
+
+def diff_iterate(x, mu):
+    return -2 * mu * x
+
+def diff_iterate2(x, mu):
+    return -np.sin(x) - 2 * mu * x
+
+def _period(tail, tol, max_period):
+    '''period of each column of an orbit tail, 0 if aperiodic, longer than max_period or diverged
+
+    The period is the smallest k for which the last k values of the
+    tail each repeat the one k steps earlier to within tol. Orbits that
+    settle too slowly, right at a doubling, come out as 0 too.
+    '''
+    n = len(tail)
+    k = np.zeros(tail.shape[1], dtype=np.int64)
+    for p in range(1, max_period + 1):
+        match = (k == 0) & (np.abs(tail[n - p:] - tail[n - 2 * p:n - p]) <= tol).all(axis=0)
+        k[match] = p
+    return k
+
+def cycle(mu, x, k, extend=False, n_newton=50):
+    '''(point, multiplier) of the period k cycle near x, by Newton's method on f^k(x) - x
+
+    f^k and its derivative, the product of f' along the k steps, are
+    built in one pass; k may differ per mu. Unlike iterating the map
+    this converges fast to stable and unstable cycles alike.
+    '''
+    step, diff = (iterate2, diff_iterate2) if extend else (iterate, diff_iterate)
+    mu, x, k = np.broadcast_arrays(np.asarray(mu, dtype=np.float64), np.asarray(x, dtype=np.float64), k)
+    x = x.copy()
+    with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+        for _ in range(n_newton + 1):
+            y = x.copy()
+            mult = np.ones_like(x)
+            for j in range(k.max()):
+                on = j < k
+                mult = np.where(on, mult * diff(y, mu), mult)
+                y = np.where(on, step(y, mu), y)
+            dx = (y - x) / (mult - 1)
+            if _ == n_newton or not np.any(np.abs(dx) > 1e-15):
+                break
+            x -= dx
+    return x, mult
+
+def analyze(mu, x, transient=1000, n_iter=1000, max_period=64, tol=1e-6, extend=False):
+    '''(last iterate, Lyapunov exponent, period) of the orbit from x of every mu
+
+    The exponent is the mean of log|f'(x)| over the n_iter steps after
+    the transient; the period is read from the last 2 max_period of them.
+    '''
+    step, diff = (iterate2, diff_iterate2) if extend else (iterate, diff_iterate)
+    mu = np.asarray(mu, dtype=np.float64)
+    x = np.array(np.broadcast_to(x, mu.shape), dtype=np.float64)
+    n_tail = 2 * max_period
+    if n_iter < n_tail:
+        raise ValueError(f"n_iter = {n_iter} is shorter than the period tail {n_tail}")
+    lam = np.zeros(mu.shape)
+    tail = np.empty((n_tail,) + mu.shape)
+    with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+        for _ in range(transient):
+            x = step(x, mu)
+        for i in range(n_iter):
+            lam += np.log(np.abs(diff(x, mu)))
+            x = step(x, mu)
+            if i >= n_iter - n_tail:
+                tail[i - n_iter + n_tail] = x
+        # diverged tails are inf/nan and come out as period 0
+        period = _period(tail, tol, max_period)
+    return x, lam / n_iter, period
+
+class Scan:
+    '''Lyapunov exponents and periods over a growing, sorted set of mu
+
+    Every new mu starts from the last iterate of its nearest scanned
+    neighbour, which already sits on (or near) the attractor, so only
+    warm_transient steps are spent settling instead of transient.
+    '''
+    def __init__(self, x0=0.5, transient=1000, warm_transient=200, n_iter=1000,
+                 max_period=64, tol=1e-6, extend=False):
+        self.x0 = x0
+        self.transient = transient
+        self.warm_transient = warm_transient
+        self.kw = dict(n_iter=n_iter, max_period=max_period, tol=tol, extend=extend)
+        self.mu = np.empty(0)
+        self.x = np.empty(0)
+        self.lam = np.empty(0)
+        self.period = np.empty(0, dtype=np.int64)
+
+    def add(self, mu) -> None:
+        '''scan new mu values, warm started from their nearest neighbours if there are any'''
+        mu = np.setdiff1d(np.asarray(mu, dtype=np.float64), self.mu)
+        if not mu.size:
+            return
+        if self.mu.size:
+            j = np.clip(np.searchsorted(self.mu, mu), 1, len(self.mu)) - 1
+            j_hi = np.minimum(j + 1, len(self.mu) - 1)
+            j = np.where(np.abs(self.mu[j_hi] - mu) < np.abs(self.mu[j] - mu), j_hi, j)
+            start = np.where(np.isfinite(self.x[j]), self.x[j], self.x0)
+            x, lam, period = analyze(mu, start, self.warm_transient, **self.kw)
+        else:
+            x, lam, period = analyze(mu, self.x0, self.transient, **self.kw)
+        order = np.argsort(np.concatenate([self.mu, mu]), kind='stable')
+        self.mu = np.concatenate([self.mu, mu])[order]
+        self.x = np.concatenate([self.x, x])[order]
+        self.lam = np.concatenate([self.lam, lam])[order]
+        self.period = np.concatenate([self.period, period])[order]
+
+    def doublings(self, xtol=1e-12, max_steps=64) -> tuple[np.ndarray, np.ndarray]:
+        '''(mu, period before) of every period k -> 2k doubling seen in the scan
+
+        The doubling is where the k cycle multiplier crosses -1. Labels
+        only say where to look: after a run of period k that is followed
+        by 2k, the multiplier is computed at every scanned mu up to the
+        first label other than k, 2k or unresolved, each cycle started
+        from that mu's orbit tail. Slowly settling orbits near the
+        doubling may carry either label, so the bracket is the first
+        pair of neighbours where the multiplier itself crosses. All
+        brackets are then bisected together, continuing the cycle from
+        the previous midpoint.
+        '''
+        extend = self.kw['extend']
+        i = np.flatnonzero(self.period > 0)
+        r = self.period[i]
+        last = np.flatnonzero(r[:-1] != r[1:])
+        seeds = last[r[last + 1] == 2 * r[last]]
+        windows = {}
+        for s in seeds:
+            k = r[s]
+            other = np.flatnonzero((r[s + 1:] != k) & (r[s + 1:] != 2 * k))
+            stop = i[s + 1 + other[0]] if other.size else len(self.mu)
+            # runs of k broken up by label noise share the window of the first one
+            windows.setdefault((k, stop), i[s])
+        if not windows:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+        j = np.concatenate([np.arange(start, stop) for (_, stop), start in windows.items()])
+        owner = np.repeat(np.arange(len(windows)), [stop - start for (_, stop), start in windows.items()])
+        kj = np.array([k for k, _ in windows])[owner]
+        xj, mult = cycle(self.mu[j], self.x[j], kj, extend)
+        cross = np.flatnonzero((owner[1:] == owner[:-1]) & (mult[1:] <= -1)
+                               & (mult[:-1] > -1) & (mult[:-1] < 1)) + 1
+        # the first crossing of each window
+        cross = cross[np.unique(owner[cross], return_index=True)[1]]
+        a, b, k, x = self.mu[j[cross - 1]], self.mu[j[cross]], kj[cross], xj[cross - 1]
+        for _ in range(max_steps):
+            if not a.size or np.all(b - a < xtol):
+                break
+            mid = (a + b) / 2
+            x_mid, mult = cycle(mid, x, k, extend)
+            below = mult > -1
+            x = np.where(below & np.isfinite(x_mid), x_mid, x)
+            a = np.where(below, mid, a)
+            b = np.where(below, b, mid)
+        return (a + b) / 2, k
+
+def _refine_test(extend=False, n_mu=5000, n_refine=2000):
+    '''refining a scan around each doubling it found must keep every one of them'''
+    scan = Scan(extend=extend)
+    scan.add(np.linspace(-0.5, 2, n_mu))
+    mu_c, k = scan.doublings()
+    for m in mu_c:
+        scan.add(np.linspace(m - 0.02, m + 0.02, n_refine))
+        mu_r, k_r = scan.doublings()
+        for a, p in zip(mu_c, k):
+            near = np.abs(mu_r[k_r == p] - a)
+            assert near.size and near.min() < 1e-8, f"period {p} -> {2 * p} at mu = {a:.9f} lost after refining at {m:.6f}"
+    print(f"{len(mu_c)} doublings kept through {len(mu_c)} refinements")
+
+def plot_lyapunov(extend=False, n_mu=5000):
+    scan = Scan(extend=extend)
+    scan.add(np.linspace(-0.5, 2, n_mu))
+    mu_c, k = scan.doublings()
+    for m, p in zip(mu_c, k):
+        print(f"period {p} -> {2 * p} at mu = {m:.9f}")
+
+    fig, ax = plt.subplots(2, 1, figsize=(15, 10), sharex=True)
+    plt.rcParams['font.size'] = 14
+    ax[0].plot(scan.mu, scan.lam, lw=0.5)
+    ax[0].axhline(0, color="k", lw=0.5)
+    ax[0].set_ylabel("$\lambda$")
+    ax[0].set_ylim((-4, 1))
+    ax[1].scatter(scan.mu, scan.period, s=0.5)
+    ax[1].set_yscale("log", base=2)
+    ax[1].set_ylabel("period")
+    ax[1].set_xlabel("$\mu$")
+    for a in ax:
+        for m in mu_c:
+            a.axvline(m, color="r", lw=0.5, ls="--")
+        a.set_xlim((-0.5, 2))
+        a.grid()
+    # plt.savefig("lyapunov.png")
+    plt.show()
+
+if __name__ == "__main__":
+    _refine_test(False)
+    _refine_test(True)
+    plot_lyapunov(False)
@@ -0,0 +1,91 @@
+import csv
+import json
+import time
+import tracemalloc
+import numpy as np
+from typing import Callable, Iterable
+
+def _autorange(f: Callable, x: np.ndarray, min_ns: int) -> int:
+    '''calls per trial so that a trial lasts at least min_ns; doubles as the warmup'''
+    number = 1
+    while True:
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            f(x)
+        if time.perf_counter_ns() - start >= min_ns:
+            return number
+        number *= 2
+
+def _peak(f: Callable, x: np.ndarray) -> int:
+    '''high water mark of Python / NumPy heap allocations in one call
+
+    Arrays numba allocates inside nopython code are not traced.
+    '''
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        f(x)
+        return tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+
+def measure(f: Callable, x: np.ndarray, repeat: int = 7, min_ns: int = 1_000_000) -> dict:
+    '''median and quartiles of the time per call of f(x) over repeat trials, in ns'''
+    f(x)  # warmup: jit compile, plan cache
+    number = _autorange(f, x, min_ns)
+    trials = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            f(x)
+        trials.append((time.perf_counter_ns() - start) / number)
+    q1, median, q3 = np.percentile(trials, [25, 50, 75])
+    return {"number": number, "repeat": repeat, "median_ns": median,
+            "q1_ns": q1, "q3_ns": q3, "iqr_ns": q3 - q1, "peak_bytes": _peak(f, x)}
+
+def sweep(funcs: dict[str, Callable],
+          sizes: Iterable[int],
+          make: Callable[[int], np.ndarray] = lambda n: np.random.rand(n),
+          check: Callable[[np.ndarray, np.ndarray], float] | None = None,
+          limits: dict[str, int] = {},
+          budget: float = 10.,
+          repeat: int = 7) -> list[dict]:
+    '''measure every function on inputs of every size
+
+    check(x, f(x)) is stored as the error of each record. A function is
+    dropped from larger sizes once it exceeds limits[name] or its median
+    call takes longer than budget seconds.
+    '''
+    records = []
+    active = dict(funcs)
+    for n in sizes:
+        x = make(n)
+        for name, f in list(active.items()):
+            if n > limits.get(name, n):
+                del active[name]
+                continue
+            rec = {"name": name, "n": n}
+            rec.update(measure(f, x, repeat))
+            rec["err"] = float(check(x, f(x))) if check is not None else None
+            print(f"{name:>10} n={n:<9d} {rec['median_ns'] / 1e6:12.4f} ms "
+                  f"± {rec['iqr_ns'] / 2e6:.4f}  peak {rec['peak_bytes'] / 2**20:.1f} MiB")
+            records.append(rec)
+            if rec["median_ns"] > budget * 1e9:
+                del active[name]
+    return records
+
+def write_json(records: list[dict], path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(records, f, indent=1)
+
+def write_csv(records: list[dict], path: str) -> None:
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(records[0]))
+        writer.writeheader()
+        writer.writerows(records)
+
+def series(records: list[dict], name: str, key: str) -> tuple[np.ndarray, np.ndarray]:
+    '''(n, key) of one function's records, for plotting'''
+    rows = [(r["n"], r[key]) for r in records if r["name"] == name]
+    return tuple(np.array(col, dtype=np.float64) for col in zip(*rows)) if rows else (np.empty(0), np.empty(0))
@@ -1,7 +1,9 @@
 import matplotlib.pyplot as plt
 import numpy as np
 
-DATA = np.fromfile('waveform.dat', dtype=np.float32, sep='	').reshape(-1, 2)
+from loader import load
+
+DATA = load('waveform.dat', np.float32)
 
 if __name__ == "__main__":
     fig, axes = plt.subplots(2, 1, figsize=(10, 8)) 
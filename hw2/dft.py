@@ -1,61 +1,405 @@
 import numpy as np
 from numpy import complex128 as comp
-from numba import jit
-import time
+from numba import njit
+from collections import OrderedDict
+from typing import Callable
 
-def dft(x:np.ndarray, rev:int=1) -> np.ndarray:
+from bench import sweep, series, write_csv, write_json
+from loader import load
+
+class LRUCache:
+    '''least recently used cache bounded by the total nbytes of its values'''
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.data = OrderedDict()
+        self.nbytes = 0
+
+    def get(self, key, build: Callable):
+        if key in self.data:
+            self.data.move_to_end(key)
+            return self.data[key]
+        value = build()
+        self.data[key] = value
+        self.nbytes += value.nbytes
+        # evict the oldest, but always keep the newest entry
+        while self.nbytes > self.max_bytes and len(self.data) > 1:
+            _, old = self.data.popitem(last=False)
+            self.nbytes -= old.nbytes
+        return value
+
+    def clear(self) -> None:
+        self.data.clear()
+        self.nbytes = 0
+
+PLANS = LRUCache(256 << 20)
+DFT_MATRIX_MAX = 2048  # larger dft matrices are never built whole
+DFT_TILE = 64 << 20  # bytes of matrix rows (indices + values) a tiled dft holds at once
+
+def _cdtype(x: np.ndarray) -> np.dtype:
+    '''complex64 for single precision input, complex128 otherwise'''
+    return np.result_type(x.dtype, np.complex64)
+
+def _roots(n: int, rev: int, dtype: np.dtype) -> np.ndarray:
+    '''cached roots of unity exp(rev 2πi k/n), k = 0 .. n - 1'''
+    return PLANS.get(('roots', n, rev, dtype), lambda: np.exp(rev * 2j * np.pi * np.arange(n) / n).astype(dtype))
+
+def _dft_rows(k: np.ndarray, n: int, rev: int, dtype: np.dtype) -> np.ndarray:
+    '''rows k of the dft matrix, W^(jk) looked up by the exponent jk mod n'''
+    idx = np.outer(k, np.arange(n))
+    np.remainder(idx, n, out=idx)
+    return _roots(n, rev, dtype)[idx]
+
+def _dft_matrix(n: int, rev: int, dtype: np.dtype) -> np.ndarray:
+    return _dft_rows(np.arange(n), n, rev, dtype)
+
+def dft(x:np.ndarray, rev:int=1, tile:int=DFT_TILE) -> np.ndarray:
+    '''direct O(n^2) transform, normalized by 1/sqrt(n)
+
+    Matrices up to DFT_MATRIX_MAX are cached whole. Above that the
+    matrix is generated a block of rows at a time, holding at most
+    tile bytes, so memory stays O(n + tile) for any n.
+    '''
     sign = 1 if rev == 1 else -1
+    x = np.asarray(x)
     length = len(x)
-    res = np.zeros(length, dtype=comp)
-    tr_mat_index = np.ones((length, length), dtype=comp)
-    for i in range(length):
-        tr_mat_index[i,:] *= i
-        tr_mat_index[:,i] *= i
-    tr_mat = np.exp(sign * 2j * np.pi * tr_mat_index / length, dtype=comp)
-    res = np.dot(tr_mat, x) / np.sqrt(len(x), dtype=comp)
+    dtype = _cdtype(x)
+    if length <= DFT_MATRIX_MAX:
+        tr_mat = PLANS.get(('dft', length, sign, dtype), lambda: _dft_matrix(length, sign, dtype))
+        return np.dot(tr_mat, x) / np.sqrt(length)
+    rows = max(1, tile // (length * (8 + dtype.itemsize)))
+    k = np.arange(length)
+    res = np.empty(length, dtype=dtype)
+    for r0 in range(0, length, rows):
+        res[r0:r0 + rows] = np.dot(_dft_rows(k[r0:r0 + rows], length, sign, dtype), x)
+    return res / np.sqrt(length)
+
+def _pad2(x: np.ndarray) -> np.ndarray:
+    '''zero pad the last axis to the next power of 2'''
+    n = x.shape[-1]
+    if n & (n - 1):
+        x = np.concatenate([x, np.zeros((*x.shape[:-1], (1 << n.bit_length()) - n), dtype=x.dtype)], axis=-1)
+    return x
+
+def _bitrev(n: int) -> np.ndarray:
+    '''bit reversed permutation of range(n), n a power of 2'''
+    bits = n.bit_length() - 1
+    idx = np.arange(n)
+    res = np.zeros(n, dtype=np.int64)
+    for b in range(bits):
+        res |= ((idx >> b) & 1) << (bits - 1 - b)
     return res
 
-@jit(nopython=True)
-def fftjit(x: np.ndarray, rev: int = 1) -> np.ndarray:
-    x = x.astype(np.complex128)
-    n = x.size
-    if (n & (n - 1)) != 0:
-        new_n = 1
-        while new_n < n:
-            new_n <<= 1
-        zeros = np.zeros(new_n - n, dtype=np.complex128)
-        x = np.concatenate((x, zeros))
-        n = new_n
-    if n == 1:
-        return x
-    even = fftjit(x[::2], rev)
-    odd = fftjit(x[1::2], rev)
-    base = np.exp(rev * 2j * np.pi * np.arange(n // 2) / n)
-    return np.concatenate((even + base * odd, even - base * odd))
-
-def fft(x: np.ndarray, rev: int = 1) -> np.ndarray:
-    n = x.size
-    if n == 1:  return x
-    if (n & (n - 1)) != 0:
-        new_n = 1 << (n.bit_length())
-        x = np.concatenate([x, np.zeros(new_n - n, dtype=x.dtype)])
-        n = new_n
-    even = fft(x[::2], rev)
-    odd = fft(x[1::2], rev)
-    base = np.exp(rev * 2j * np.pi * np.arange(n // 2, dtype=comp) / n)
-    return np.concatenate([even + base * odd, even - base * odd])
-
-def _timestamp(txt=""):
-    global last
-    cur = time.time()
-    if 'last' in globals() and txt:
-        inv = cur - last
-        print(f"{txt}: {inv:.6f} s")
-        last = cur
-        return inv
-    else:
-        last = cur
-        return 
+@njit
+def _fft_kernel(rows: np.ndarray, perm: np.ndarray, roots: np.ndarray, radix: int) -> None:
+    '''in place iterative fft of every row, roots[k] = exp(rev 2πi k/n), n a power of 2'''
+    for r in range(rows.shape[0]):
+        _fft_row(rows[r], perm, roots, radix)
+
+@njit
+def _fft_row(y: np.ndarray, perm: np.ndarray, roots: np.ndarray, radix: int) -> None:
+    n = len(y)
+    for i in range(n):
+        j = perm[i]
+        if i < j:
+            y[i], y[j] = y[j], y[i]
+    q = 1
+    while q < n:
+        if radix == 4 and 4 * q <= n:
+            # two radix 2 stages q -> 2q -> 4q fused, W_4 = roots[n / 4]
+            stride = n // (4 * q)
+            w4 = roots[n // 4] if n >= 4 else roots[0]
+            for k in range(q):
+                w1 = roots[k * stride]
+                w2 = roots[2 * k * stride]
+                w3 = w1 * w4
+                for s in range(0, n, 4 * q):
+                    a0 = y[s + k]
+                    a1 = w2 * y[s + q + k]
+                    a2 = y[s + 2 * q + k]
+                    a3 = w2 * y[s + 3 * q + k]
+                    t0, t1 = a0 + a1, a0 - a1
+                    b0, b1 = w1 * (a2 + a3), w3 * (a2 - a3)
+                    y[s + k] = t0 + b0
+                    y[s + 2 * q + k] = t0 - b0
+                    y[s + q + k] = t1 + b1
+                    y[s + 3 * q + k] = t1 - b1
+            q *= 4
+        else:
+            stride = n // (2 * q)
+            for k in range(q):
+                w = roots[k * stride]
+                for s in range(0, n, 2 * q):
+                    a = y[s + k]
+                    b = w * y[s + q + k]
+                    y[s + k] = a + b
+                    y[s + q + k] = a - b
+            q *= 2
+
+class FFTPlan:
+    '''precomputed tables of an fft of length n (a power of 2)
+
+    Holds the bit reversal permutation, the n roots of unity for the
+    numba kernel and the contiguous twiddles of every stage for the
+    NumPy path, so executing it costs only the butterflies.
+    '''
+    def __init__(self, n: int, rev: int = 1, dtype: np.dtype = comp, radix: int = 4):
+        if n < 1 or n & (n - 1):
+            raise ValueError(f"FFTPlan needs a power of 2, got {n}")
+        self.n = n
+        self.rev = rev
+        self.dtype = np.dtype(dtype)
+        self.radix = radix
+        self.perm = _bitrev(n)
+        self.roots = np.exp(rev * 2j * np.pi * np.arange(n) / n).astype(self.dtype)
+        self.stages = []  # (q, twiddles) per stage, 3 arrays for radix 4, 1 for radix 2
+        q = 1
+        while q < n:
+            if radix == 4 and 4 * q <= n:
+                w1 = self.roots[::n // (4 * q)][:q].copy()
+                w2 = self.roots[::n // (2 * q)][:q].copy()
+                self.stages.append((q, (w1, w2, w1 * self.dtype.type(rev * 1j))))
+                q *= 4
+            else:
+                self.stages.append((q, (self.roots[::n // (2 * q)][:q].copy(),)))
+                q *= 2
+
+    @property
+    def nbytes(self) -> int:
+        return (self.perm.nbytes + self.roots.nbytes
+                + sum(w.nbytes for _, ws in self.stages for w in ws))
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        '''fft along the last axis by vectorized butterflies, returns a new array'''
+        # blocks never straddle rows as every stage length divides n
+        y = np.take(x, self.perm, axis=-1).astype(self.dtype, copy=False)
+        for q, ws in self.stages:
+            if len(ws) == 3:
+                w1, w2, w3 = ws
+                blk = y.reshape(-1, 4, q)
+                a1 = w2 * blk[:, 1]
+                a3 = w2 * blk[:, 3]
+                t0 = blk[:, 0] + a1
+                t1 = blk[:, 0] - a1
+                b0 = w1 * (blk[:, 2] + a3)
+                b1 = w3 * (blk[:, 2] - a3)
+                blk[:, 0] = t0 + b0
+                blk[:, 2] = t0 - b0
+                blk[:, 1] = t1 + b1
+                blk[:, 3] = t1 - b1
+            else:
+                blk = y.reshape(-1, 2, q)
+                b = ws[0] * blk[:, 1]
+                blk[:, 1] = blk[:, 0] - b
+                blk[:, 0] += b
+        return y
+
+    def jit(self, y: np.ndarray) -> np.ndarray:
+        '''fft along the last axis of y in place by the numba kernel
+
+        y must be C contiguous with the plan's dtype.
+        '''
+        _fft_kernel(y.reshape(-1, self.n), self.perm, self.roots, self.radix)
+        return y
+
+def _factor(n: int) -> list[int] | None:
+    '''radices 4, 2, 3, 5, 7 whose product is n, or None if n has another prime factor'''
+    res = []
+    for r in (4, 2, 3, 5, 7):
+        while n % r == 0:
+            res.append(r)
+            n //= r
+    return res if n == 1 else None
+
+class MixedRadixPlan:
+    '''tables of an fft of length n = 2^a 3^b 5^c 7^d
+
+    Decimation in time, one level per radix: the r interleaved sub
+    sequences are transformed together (recursively), twiddled and
+    combined by a small r x r DFT matrix. Every level is one vectorized
+    pass over all the data.
+    '''
+    def __init__(self, n: int, rev: int = 1, dtype: np.dtype = comp):
+        factors = _factor(n)
+        if factors is None:
+            raise ValueError(f"MixedRadixPlan needs n with prime factors 2, 3, 5, 7, got {n}")
+        self.n = n
+        self.rev = rev
+        self.dtype = np.dtype(dtype)
+        self.levels = []  # (r, twiddles (r, m), r-point DFT matrix)
+        for r in factors:
+            m = n // r
+            tw = np.exp(rev * 2j * np.pi * (np.outer(np.arange(r), np.arange(m)) % n) / n)
+            self.levels.append((r, tw.astype(self.dtype), _dft_matrix(r, rev, self.dtype)))
+            n = m
+
+    @property
+    def nbytes(self) -> int:
+        return sum(tw.nbytes + wr.nbytes for _, tw, wr in self.levels)
+
+    def _level(self, x: np.ndarray, i: int) -> np.ndarray:
+        if i == len(self.levels):
+            return x
+        r, tw, wr = self.levels[i]
+        m = x.shape[-1] // r
+        # x[..., j::r] for all j at once, transformed as a batch
+        sub = self._level(x.reshape(*x.shape[:-1], m, r).swapaxes(-1, -2), i + 1)
+        # X[k1 + m k2] = sum_j W_r^(j k2) W_n^(j k1) F_j[k1]
+        return (wr @ (sub * tw)).reshape(x.shape)
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        '''fft along the last axis, returns a new array'''
+        return self._level(np.asarray(x).astype(self.dtype), 0)
+
+    def jit(self, y: np.ndarray) -> np.ndarray:
+        '''no numba kernel for mixed radices, the vectorized path is already one pass per level'''
+        return self(y)
+
+class BluesteinPlan:
+    '''tables of an fft of any length n as a chirp z convolution
+
+    jk = (j^2 + k^2 - (k - j)^2) / 2 turns the transform into a
+    convolution with the chirp, done by power of 2 ffts of length
+    m >= 2n - 1. The transformed chirp is kept, so each call costs two
+    ffts of length m.
+    '''
+    def __init__(self, n: int, rev: int = 1, dtype: np.dtype = comp, radix: int = 4):
+        self.n = n
+        self.rev = rev
+        self.dtype = np.dtype(dtype)
+        self.radix = radix
+        self.m = 1 << (2 * n - 2).bit_length()
+        j = np.arange(n)
+        # j^2 mod 2n keeps the phase accurate for large j
+        self.chirp = np.exp(rev * 1j * np.pi * (j * j % (2 * n)) / n).astype(self.dtype)
+        b = np.zeros(self.m, dtype=self.dtype)
+        b[:n] = self.chirp.conj()
+        b[self.m - n + 1:] = self.chirp[1:][::-1].conj()
+        self.b = plan(self.m, rev, self.dtype, radix)(b) / self.m
+
+    @property
+    def nbytes(self) -> int:
+        return self.chirp.nbytes + self.b.nbytes
+
+    def _run(self, x: np.ndarray, jit: bool) -> np.ndarray:
+        fwd = plan(self.m, self.rev, self.dtype, self.radix)
+        inv = plan(self.m, -self.rev, self.dtype, self.radix)
+        a = np.zeros((*x.shape[:-1], self.m), dtype=self.dtype)
+        a[..., :self.n] = x * self.chirp
+        a = fwd.jit(a) if jit else fwd(a)
+        a *= self.b
+        a = inv.jit(a) if jit else inv(a)
+        return a[..., :self.n] * self.chirp
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        '''fft along the last axis, returns a new array'''
+        return self._run(np.asarray(x), False)
+
+    def jit(self, y: np.ndarray) -> np.ndarray:
+        '''fft of y with the length m transforms done by the numba kernel'''
+        return self._run(y, True)
+
+def plan(n: int, rev: int = 1, dtype: np.dtype = comp, radix: int = 4) -> FFTPlan | MixedRadixPlan | BluesteinPlan:
+    '''cached plan for length n: radix 2/4 for powers of 2, mixed radix for 7-smooth n, else Bluestein'''
+    dtype = np.dtype(dtype)
+    if n & (n - 1) == 0:
+        return PLANS.get(('fft', n, rev, dtype, radix), lambda: FFTPlan(n, rev, dtype, radix))
+    if _factor(n) is not None:
+        return PLANS.get(('mixed', n, rev, dtype), lambda: MixedRadixPlan(n, rev, dtype))
+    return PLANS.get(('bluestein', n, rev, dtype, radix), lambda: BluesteinPlan(n, rev, dtype, radix))
+
+def fftjit(x: np.ndarray, rev: int = 1, radix: int = 4, pad: bool = False, axis: int = -1) -> np.ndarray:
+    '''fft along axis with the power of 2 transforms done by the numba kernel
+
+    Any length is transformed exactly; pad=True zero pads to the next
+    power of 2 instead, which changes the output length and the bins.
+    '''
+    x = np.moveaxis(np.asarray(x), axis, -1)
+    if pad:
+        x = _pad2(x)
+    dtype = _cdtype(x)
+    # the kernel works in place, so always hand it a copy of the caller's data
+    y = plan(x.shape[-1], rev, dtype, radix).jit(np.array(x, dtype=dtype, order='C', copy=True))
+    return np.moveaxis(y, -1, axis)
+
+def fft(x: np.ndarray, rev: int = 1, radix: int = 4, pad: bool = False, axis: int = -1) -> np.ndarray:
+    '''iterative fft of any length along axis, every row in the same vectorized pass
+
+    Same rev convention as dft but not normalized. radix=4 fuses pairs
+    of radix 2 stages, so the data is swept half as often. Lengths that
+    are not powers of 2 go through the mixed radix or Bluestein plans,
+    the output has the input's length; pad=True zero pads to the next
+    power of 2 instead. Tables come from the plan cache.
+    '''
+    x = np.moveaxis(np.asarray(x), axis, -1)
+    if pad:
+        x = _pad2(x)
+    return np.moveaxis(plan(x.shape[-1], rev, _cdtype(x), radix)(x), -1, axis)
+
+def fft2(x: np.ndarray, rev: int = 1, axes: tuple[int, int] = (-2, -1)) -> np.ndarray:
+    '''2-D fft over axes, batched over the others'''
+    return fft(fft(x, rev, axis=axes[1]), rev, axis=axes[0])
+
+def rfft(x: np.ndarray, rev: int = 1, axis: int = -1) -> np.ndarray:
+    '''fft of real x along axis, the n // 2 + 1 non negative bins
+
+    For even n the even and odd samples are packed into one complex
+    sequence of length n / 2, transformed once and separated by the
+    Hermitian symmetry. rfft(x, -1) is np.fft.rfft(x).
+    '''
+    x = np.moveaxis(np.asarray(x), axis, -1)
+    n = x.shape[-1]
+    dtype = _cdtype(x)
+    if n % 2:
+        return np.moveaxis(fft(x, rev)[..., :n // 2 + 1], -1, axis)
+    h = n // 2
+    z = fft(x[..., 0::2] + 1j * x[..., 1::2], rev).astype(dtype, copy=False)
+    k = np.arange(h + 1)
+    zc = np.conj(z[..., -k % h])  # conj(Z[h - k]) for k = 0 .. h
+    z = z[..., k % h]
+    w = PLANS.get(('rfft', n, rev, dtype), lambda: (-0.5j * np.exp(rev * 2j * np.pi * k / n)).astype(dtype))
+    res = 0.5 * (z + zc) + w * (z - zc)
+    return np.moveaxis(res, -1, axis)
+
+def irfft(X: np.ndarray, n: int | None = None, rev: int = 1, axis: int = -1) -> np.ndarray:
+    '''real x of length n (default 2 (m - 1)) with rfft(x, rev) = X, normalized by 1 / n
+
+    irfft(X, rev=-1) is np.fft.irfft(X). Even n uses one complex fft of
+    length n / 2.
+    '''
+    X = np.moveaxis(np.asarray(X), axis, -1)
+    m = X.shape[-1]
+    n = 2 * (m - 1) if n is None else n
+    dtype = _cdtype(X)
+    X = X[..., :n // 2 + 1]
+    if X.shape[-1] < n // 2 + 1:
+        # missing high bins are zero, as in np.fft.irfft
+        X = np.concatenate([X, np.zeros((*X.shape[:-1], n // 2 + 1 - X.shape[-1]), dtype=X.dtype)], axis=-1)
+    # a real x has real dc and nyquist bins, np.fft.irfft drops their imaginary parts
+    X = X.astype(dtype, copy=True)
+    X[..., 0] = X[..., 0].real
+    if n % 2 == 0:
+        X[..., -1] = X[..., -1].real
+    if n % 2:
+        # full Hermitian spectrum, then one complex transform
+        full = np.concatenate([X, np.conj(X[..., 1:][..., ::-1])], axis=-1)
+        return np.moveaxis(fft(full, -rev).real / n, -1, axis)
+    h = n // 2
+    Xc = np.conj(X[..., ::-1])  # conj(X[h - k])
+    w = PLANS.get(('irfft', n, rev, dtype), lambda: (0.5j * np.exp(-rev * 2j * np.pi * np.arange(h) / n)).astype(dtype))
+    # z = e + i o with e, o the spectra of the even and odd samples
+    z = fft(0.5 * (X[..., :h] + Xc[..., :h]) + w * (X[..., :h] - Xc[..., :h]), -rev) / h
+    res = np.empty((*X.shape[:-1], n), dtype=z.real.dtype)
+    res[..., 0::2] = z.real
+    res[..., 1::2] = z.imag
+    return np.moveaxis(res, -1, axis)
+
+def rfft2(x: np.ndarray, rev: int = 1) -> np.ndarray:
+    '''2-D fft of real x over the last two axes, half spectrum along the last'''
+    return fft(rfft(x, rev), rev, axis=-2)
+
+def irfft2(X: np.ndarray, n: int | None = None, rev: int = 1) -> np.ndarray:
+    '''inverse of rfft2 normalized by 1 / size, n is the length of the last axis'''
+    return irfft(fft(X, -rev, axis=-2) / X.shape[-2], n, rev)
 
 def _dft_test():
     sample = np.random.rand(1 << 4)
@@ -73,89 +417,62 @@ def _dft_test():
     plt.savefig("hw2/figs/dftcheck.png")
     plt.show()
 
-def _fft_test():
-    times = []
-    errs = []
-    for i in range(5, 25):
-        print(1 << i)
-        sample = np.random.rand(1 << i)
-        _timestamp()
-        res = np.fft.fft(sample)
-        res = np.fft.ifft(sample)
-        times.append(_timestamp("usage"))
-        errs.append(np.sum(np.abs(res - sample)))
-    
-    with open("hw2/fft_results.txt", "r") as f:
-        data = f.read()
-    cresults = np.array(data.split(), dtype=np.float128).reshape(-1,5)
+# forward then inverse, each normalized to return x
+ROUNDTRIPS = {
+    "dft": lambda x: dft(dft(x, -1), 1),
+    "fft": lambda x: fft(fft(x, -1), 1) / len(x),
+    "jit fft": lambda x: fftjit(fftjit(x, -1), 1) / len(x),
+    "np.fft": lambda x: np.fft.ifft(np.fft.fft(x)),
+}
+
+def _roundtrip_err(x: np.ndarray, y: np.ndarray) -> float:
+    return np.sum(np.abs(y - x))
+
+def _test(lo: int = 4, hi: int = 15, out: str = "hw2/bench_results") -> list[dict]:
+    '''time the round trip of every transform for n = 2^lo .. 2^(hi - 1), saved to out.json and out.csv'''
+    records = sweep(ROUNDTRIPS, [1 << i for i in range(lo, hi)],
+                    check=_roundtrip_err, limits={"dft": 1 << 14})
+    write_json(records, out + ".json")
+    write_csv(records, out + ".csv")
+    return records
+
+def _plot(records: list[dict], path: str) -> None:
+    '''time (median, IQR band) and error against size, with the c++ results of fft_results.txt'''
+    import matplotlib.pyplot as plt
+    cresults = load("hw2/fft_results.txt")
 
     fig, axes = plt.subplots(1,2, figsize=(14, 6))
     plt.rcParams['font.size'] = 14
     plt.tight_layout(pad=3)
 
-    axes[0].plot(np.arange(5, 25), times, label="np.fft")
-    axes[0].plot(np.arange(5, 25), cresults[:,1], label="fft")
-    axes[0].plot(np.arange(5, 25), cresults[:,3], label="iterate fft")
+    for name in ROUNDTRIPS:
+        n, med = series(records, name, "median_ns")
+        _, q1 = series(records, name, "q1_ns")
+        _, q3 = series(records, name, "q3_ns")
+        axes[0].plot(np.log2(n), med / 1e9, label=name)
+        axes[0].fill_between(np.log2(n), q1 / 1e9, q3 / 1e9, alpha=0.3)
+        axes[1].plot(np.log2(n), series(records, name, "err")[1], label=name)
+    axes[0].plot(np.log2(cresults[:,0]), cresults[:,1], label="c++ fft")
+    axes[0].plot(np.log2(cresults[:,0]), cresults[:,3], label="c++ iterate fft")
     axes[0].set_xlabel("log2 of sample size")
     axes[0].set_ylabel("time/s")
     axes[0].set_yscale("log")
     axes[0].legend()
 
-    axes[1].plot(np.arange(5, 25), errs, label="np.fft")
-    axes[1].plot(np.arange(5, 25), cresults[:,2], label="fft")
-    axes[1].plot(np.arange(5, 25), cresults[:,4], label="iterate fft")
+    axes[1].plot(np.log2(cresults[:,0]), cresults[:,2], label="c++ fft")
+    axes[1].plot(np.log2(cresults[:,0]), cresults[:,4], label="c++ iterate fft")
     axes[1].set_xlabel("log2 of sample size")
     axes[1].set_ylabel("error")
     axes[1].set_yscale("log")
     axes[1].legend()
-    plt.savefig("hw2/figs/ffttime.png")
+    plt.savefig(path)
     plt.show()
 
-def _test():
-    '''return a np.ndarray with shape (9, 9)'''
-    res = np.zeros((11, 12), dtype=np.float128)
-    for index in range(4, 15):
-        sample = np.random.rand(1 << index)
-        print("sample size:", len(sample))
-        _timestamp()
-        dft_res = dft(sample, 1)
-        res[index - 4, 0] = _timestamp("dft usage")
-        idft_res = dft(dft_res, -1)
-        res[index - 4, 1] = _timestamp("idft usage")
-        res[index - 4, 2] = np.sum(np.abs(idft_res - sample))
-        print("errs:", res[index - 4, 2])
-        
-        _timestamp()
-        fft_res = fft(sample, 1) / np.sqrt(len(sample), dtype=comp)
-        res[index - 4, 3] = _timestamp("fft usage")
-        ifft_res = fft(fft_res, -1) / np.sqrt(len(sample), dtype=comp)
-        res[index - 4, 4] = _timestamp("ifft usage") 
-        res[index - 4, 5] = np.sum(np.abs(ifft_res - sample))
-        print("errs:", res[index - 4, 5])
-
-        _timestamp()
-        dft_res = fftjit(sample, 1) / np.sqrt(len(sample), dtype=comp)
-        res[index - 4, 6] = _timestamp("jit fft usage")
-        ifft_res = fftjit(fft_res, -1) / np.sqrt(len(sample), dtype=comp)
-        res[index - 4, 7] = _timestamp("jit ifft usage") 
-        res[index - 4, 8] = np.sum(np.abs(ifft_res - sample))
-        print("errs:", res[index - 4, 8])
-
-        _timestamp()
-        dft_res = np.fft.fft(sample)
-        res[index - 4, 9] = _timestamp("np.fft usage")
-        idft_res = np.fft.ifft(dft_res)
-        res[index - 4, 10] = _timestamp("np.ifft usage")
-        res[index - 4, 11] = np.sum(np.abs(idft_res - sample))
-        print("errs:", res[index - 4, 11])
-
-    return res
+def _fft_test():
+    _plot(_test(5, 25, "hw2/fft_bench"), "hw2/figs/ffttime.png")
 
 def data():
-    path = "hw2/waveform.dat"
-    with open(path, "r") as f:
-        data = f.read()
-    data = np.array(data.split(), dtype=np.float128).reshape(-1, 2)
+    data = load("hw2/waveform.dat")
     length = data.shape[0]
     x = data[:, 0]
     y = data[:, 1]
@@ -196,40 +513,11 @@ def data():
     plt.close()
 
 if __name__ == "__main__":
-    cresults = [2.09e-5, 2.21e-5, 3.11e-5, 7.28e-5, 0.0001, 0.00021, 0.000459, 0.00128, 0.0021, 0.0045, 0.012]
-
     import matplotlib.pyplot as plt
 
-
-    _fft_test()    
+    _fft_test()
     import sys
     sys.exit(0)
     _dft_test()
     data()
-    res = _test()
-
-    fig, axes = plt.subplots(1,2, figsize=(14, 6))
-    plt.rcParams['font.size'] = 14
-    plt.tight_layout(pad=3)
-
-    axes[0].plot(np.arange(4, 15), res[:, 0] + res[:, 1], label="dft")
-    axes[0].plot(np.arange(4, 15), res[:, 3] + res[:, 4], label="fft")
-    axes[0].plot(np.arange(4, 15), res[:, 6] + res[:, 7], label="jit.fft")
-    axes[0].plot(np.arange(4, 15), res[:, 9] + res[:, 10], label="np.fft")
-    axes[0].plot(np.arange(4, 15), cresults, label="c++ fft")
-    axes[0].set_xlabel("log2 of sample size")
-    axes[0].set_ylabel("time/s")
-    axes[0].set_yscale("log")
-    axes[0].legend()
-
-    axes[1].plot(np.arange(4, 15), res[:, 2], label="dft")
-    axes[1].plot(np.arange(4, 15), res[:, 5], label="np.fft")
-    axes[1].plot(np.arange(4, 15), res[:, 8], label="fft")
-    axes[1].plot(np.arange(4, 15), res[:, 11], label="jit fft")
-    axes[1].set_xlabel("log2 of sample size")
-    axes[1].set_ylabel("error")
-    axes[1].set_yscale("log")
-    axes[1].legend()
-
-    plt.savefig("hw2/figs/time.png")
-    plt.show()
\ No newline at end of file
+    _plot(_test(), "hw2/figs/time.png")
\ No newline at end of file
@@ -0,0 +1,41 @@
+import glob
+import os
+import numpy as np
+
+def _cache_path(path: str, dtype: np.dtype) -> str:
+    '''hidden sidecar next to path, keyed by the size and mtime of path'''
+    st = os.stat(path)
+    head, name = os.path.split(path)
+    return os.path.join(head, f".{name}.{st.st_size}-{st.st_mtime_ns}.{dtype.name}.npy")
+
+def _parse(path: str, dtype: np.dtype) -> np.ndarray:
+    '''whitespace separated text table, parsed in C by np.fromfile'''
+    with open(path, "r") as f:
+        cols = len(f.readline().split())
+    # a space in sep matches any run of whitespace, tabs and newlines included
+    data = np.fromfile(path, dtype=np.float64, sep=" ")
+    return data.astype(dtype, copy=False).reshape(-1, max(cols, 1))
+
+def load(path: str, dtype: np.dtype = np.float64, mmap: bool = True) -> np.ndarray:
+    '''(rows, columns) table of a text data file, cached as .npy
+
+    The first call parses the text and writes a sidecar .npy keyed by
+    the file's size and mtime; later calls memory map it (read only) or,
+    with mmap=False, read it whole. Editing the file invalidates the
+    cache, stale sidecars are removed.
+    '''
+    dtype = np.dtype(dtype)
+    cache = _cache_path(path, dtype)
+    if not os.path.exists(cache):
+        data = _parse(path, dtype)
+        head, name = os.path.split(path)
+        for old in glob.glob(os.path.join(head, f".{glob.escape(name)}.*-*.{dtype.name}.npy")):
+            os.remove(old)
+        # write then rename, so a killed run never leaves a truncated cache
+        tmp = f"{cache}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, data)
+        os.replace(tmp, cache)
+        if not mmap:
+            return data
+    return np.load(cache, mmap_mode="r" if mmap else None)
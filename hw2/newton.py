@@ -1,46 +1,158 @@
+import os
 import matplotlib.pyplot as plt
 import numpy as np
+from matplotlib.colors import to_rgb
+from functools import lru_cache
+from multiprocessing import Pool
+from numba import njit
 
-roots = [
-    1 + 0j,
-    -0.5 + (np.sqrt(3)/2)*1j,
-    -0.5 - (np.sqrt(3)/2)*1j
-]
+Z3 = (1, 0, 0, -1)  # z^3 - 1, coefficients from the highest power down
 
-def f(z):
-    return z ** 3 - 1
+def unity(n: int) -> tuple:
+    '''coefficients of z^n - 1'''
+    return (1,) + (0,) * (n - 1) + (-1,)
 
-def diff_f(z):
-    return 3 * z ** 2
+@lru_cache(maxsize=None)
+def poly_roots(coeffs: tuple) -> np.ndarray:
+    '''roots of the polynomial, computed once per coefficient tuple and ordered by angle in [0, 2π)'''
+    r = np.roots(coeffs).astype(np.complex128)
+    r = r[np.lexsort((np.abs(r), np.angle(r) % (2 * np.pi)))]
+    r.flags.writeable = False
+    return r
 
-def newton_method(z0:np.ndarray, eps=1e-2):
-    z = z0
-    while np.any(np.abs(f(z)) > eps):
-        z = z - f(z) / diff_f(z)
-    return z
+def horner(coeffs, z):
+    '''(f(z), f'(z)) in one Horner pass'''
+    p = np.full_like(z, coeffs[0])
+    dp = np.zeros_like(z)
+    for c in coeffs[1:]:
+        dp = dp * z + p
+        p = p * z + c
+    return p, dp
 
-def mapping(cntr_x, cntr_y, hfw, step, filename):
+def classify(z:np.ndarray, roots:np.ndarray) -> np.ndarray:
+    '''index of the nearest root, one root at a time so no (..., k) temporary is built'''
+    best = np.full(z.shape, np.inf)
+    basin = np.zeros(z.shape, dtype=np.int8)
+    for k, r in enumerate(roots):
+        d = np.abs(z - r)
+        closer = d < best
+        best[closer] = d[closer]
+        basin[closer] = k
+    return basin
+
+def newton_method(z0:np.ndarray, eps=1e-2, max_iter=100, coeffs=Z3):
+    '''Newton iteration of every point until |f(z)| <= eps, returns (z, steps taken)
+
+    Only the points still above eps are updated each pass. Points that
+    do not converge within max_iter steps come back with steps = max_iter.
+    '''
+    z = np.array(z0, dtype=np.complex128)
+    iters = np.full(z.shape, max_iter, dtype=np.int32)
+    flat_z, flat_it = z.reshape(-1), iters.reshape(-1)
+    idx = np.arange(z.size)
+    active = flat_z.copy()
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        for it in range(max_iter + 1):
+            fz, dfz = horner(coeffs, active)
+            done = np.abs(fz) <= eps
+            flat_z[idx[done]] = active[done]
+            flat_it[idx[done]] = it
+            keep = ~done
+            idx, active, fz, dfz = idx[keep], active[keep], fz[keep], dfz[keep]
+            if not idx.size or it == max_iter:
+                break
+            active = active - fz / dfz
+    flat_z[idx] = active
+    return z, iters
+
+@njit(cache=True)
+def _newton_tile(x, y, eps, max_iter, coeffs, roots, basin, iters):
+    '''per pixel Newton iteration, each pixel stops as soon as it converges'''
+    for i in range(len(y)):
+        for j in range(len(x)):
+            z = complex(x[j], y[i])
+            it = 0
+            while True:
+                p = coeffs[0]
+                dp = 0j
+                for c in coeffs[1:]:
+                    dp = dp * z + p
+                    p = p * z + c
+                if abs(p) <= eps or dp == 0 or it == max_iter:
+                    break
+                z = z - p / dp
+                it += 1
+            iters[i, j] = it
+            basin[i, j] = -1
+            if abs(p) <= eps:
+                best = np.inf
+                for k in range(len(roots)):
+                    d = abs(z - roots[k])
+                    if d < best:
+                        best = d
+                        basin[i, j] = k
+
+def _render_tile(args):
+    x, y, eps, max_iter, coeffs = args
+    basin = np.empty((len(y), len(x)), dtype=np.int8)
+    iters = np.empty((len(y), len(x)), dtype=np.int32)
+    _newton_tile(x, y, eps, max_iter, np.asarray(coeffs, dtype=np.complex128), poly_roots(coeffs), basin, iters)
+    return basin, iters
+
+def render(x:np.ndarray, y:np.ndarray, eps=1e-2, max_iter=100, coeffs=Z3, tile=64, processes=None):
+    '''(basin, iterations) of every pixel of the grid x + iy, rows first
+
+    basin indexes poly_roots(coeffs), the root a pixel converges to, -1 if it does
+    not within max_iter steps. Bands of tile rows are rendered on a
+    process pool, or in this process if only one worker is available.
+    '''
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    coeffs = tuple(coeffs)
+    tasks = [(x, y[i:i + tile], eps, max_iter, coeffs) for i in range(0, len(y), tile)]
+    processes = processes if processes is not None else max(1, (os.cpu_count() or 1) - 2)
+    if processes == 1 or len(tasks) == 1:
+        tiles = list(map(_render_tile, tasks))
+    else:
+        with Pool(processes=min(processes, len(tasks))) as pool:
+            tiles = pool.map(_render_tile, tasks)
+    return np.concatenate([b for b, _ in tiles]), np.concatenate([it for _, it in tiles])
+
+def shade(basin:np.ndarray, iters:np.ndarray, k=3):
+    '''RGB image: hue by basin, darker the more steps a pixel took, black if it never converged'''
+    if k <= 10:
+        colors = np.array([to_rgb(c) for c in plt.get_cmap("tab10").colors])
+    else:
+        colors = plt.get_cmap("hsv")(np.arange(k) / k)[:, :3]
+    light = 1 - 0.7 * np.log1p(iters) / np.log1p(max(iters.max(), 1))
+    img = colors[basin % len(colors)] * light[..., None]
+    img[basin < 0] = 0
+    return img
+
+def _label(coeffs) -> str:
+    n = len(coeffs) - 1
+    return f"z^{n} - 1" if tuple(coeffs) == unity(n) else f"deg {n}"
+
+def mapping(cntr_x, cntr_y, hfw, step, filename, eps=1e-2, max_iter=100, axes=True, coeffs=Z3):
     x_min = cntr_x - hfw
     x_max = cntr_x + hfw
     y_min = cntr_y - hfw
     y_max = cntr_y + hfw
     x = np.arange(x_min, x_max + step, step)
     y = np.arange(y_min, y_max + step, step)
-    X, Y = np.meshgrid(x, y)
-    Z = X + Y * 1j
-    res = newton_method(Z)
-
-    arg = np.abs(res[:, :, np.newaxis] - roots)
-    result = np.argmin(arg, axis=2)
+    basin, iters = render(x, y, eps, max_iter, coeffs)
+    img = shade(basin, iters, len(coeffs) - 1)
 
+    if not axes:
+        # one pixel per grid point, no figure around it
+        plt.imsave("hw2/" + filename, img, origin="lower")
+        return
     plt.figure(figsize=(10, 10))
     plt.rcParams['font.size'] = 16
-    plt.scatter(X, Y, c=result, cmap="tab10", s=1)
+    plt.imshow(img, origin="lower", extent=(x_min, x_max, y_min, y_max), interpolation="nearest")
     plt.xlabel("Re")
     plt.ylabel("Im")
-    plt.xlim(x_min, x_max)
-    plt.ylim(y_min, y_max)
-    plt.title(f"Newton Fractal Center: ({cntr_x}, {cntr_y}), Width: {2*hfw}")
+    plt.title(f"Newton Fractal {_label(coeffs)} Center: ({cntr_x}, {cntr_y}), Width: {2*hfw}")
     plt.savefig("hw2/" + filename)
     plt.close()
 
@@ -50,4 +162,9 @@ if __name__ == "__main__":
     print("2")
     mapping(-0.8, 0.0, 0.25, 0.0005, "newton_-0.8_0.png")
     print("3")
-    mapping(-0.56, 0.18, 0.1, 0.0002, "newton_-0.56_0.18.png")
\ No newline at end of file
+    mapping(-0.56, 0.18, 0.1, 0.0002, "newton_-0.56_0.18.png")
+    print("4")
+    mapping(-0.56, 0.18, 0.01, 0.00001, "newton_-0.56_0.18_deep.png", axes=False)
+    for n in range(3, 13):
+        print(f"z^{n} - 1")
+        mapping(0.0, 0.0, 1.5, 0.002, f"newton_z{n}.png", max_iter=500, coeffs=unity(n), axes=False)
@@ -0,0 +1,105 @@
+import numpy as np
+from itertools import chain
+from typing import Iterable, Iterator, Tuple
+
+from dft import rfft, irfft
+
+def wola(chunks: Iterable[np.ndarray],
+         block: int = 4096,
+         threshold: float | None = None,
+         band: Tuple[float, float] | None = None,
+         dt: float = 1.) -> Iterator[np.ndarray]:
+    '''spectral filter of a stream by weighted overlap-add, chunks in, filtered chunks out
+
+    Frames of length block overlap by half and are windowed by sqrt(Hann)
+    both before rfft and after irfft, so with nothing masked the output
+    is the input. Per frame, bins are kept if the sinusoid amplitude
+    they stand for is >= threshold and/or their |f| lies in band.
+    Memory is O(block + chunk size) whatever the stream length; the
+    output lags the input by up to one block and has the same length.
+    '''
+    if block % 2:
+        raise ValueError(f"block must be even, got {block}")
+    hop = block // 2
+    # sin^2 + cos^2 = 1 over the overlap of two frames
+    win = np.sin(np.pi * np.arange(block) / block)
+    freqs = np.arange(hop + 1) / (block * dt)
+    keep_band = np.ones(hop + 1, dtype=bool) if band is None else (freqs >= band[0]) & (freqs <= band[1])
+
+    tail = np.zeros(hop)  # input not yet covered by two frames, starts with hop zeros of padding
+    carry = np.zeros(hop)  # second half of the last frame's output
+    skip = hop  # outputs that belong to the padding
+    left = 0  # input samples not yet written out
+    # trailing zeros flush the last samples through both of their frames
+    for chunk in chain(chunks, [None]):
+        if chunk is None:
+            chunk = np.zeros(block)
+        else:
+            chunk = np.asarray(chunk, dtype=np.float64)
+            left += len(chunk)
+        data = np.concatenate([tail, chunk])
+        n_frames = (len(data) - block) // hop + 1
+        if n_frames <= 0:
+            tail = data
+            continue
+        frames = np.lib.stride_tricks.sliding_window_view(data, block)[::hop][:n_frames] * win
+        X = rfft(frames, -1)
+        keep = keep_band
+        if threshold is not None:
+            keep = keep & (2 * np.abs(X) >= threshold * win.sum())
+        X *= keep
+        y = irfft(X, block, -1) * win
+        out = y[:, :hop].copy()
+        out[0] += carry
+        out[1:] += y[:-1, hop:]
+        carry = y[-1, hop:]
+        tail = data[n_frames * hop:]
+
+        out = out.ravel()[skip:]
+        skip = max(0, skip - n_frames * hop)
+        out = out[:left]
+        left -= len(out)
+        if len(out):
+            yield out
+
+def _text_blocks(path: str, rows: int) -> Iterator[np.ndarray]:
+    '''(rows, columns) blocks of a whitespace separated text file'''
+    with open(path, "r") as f:
+        while True:
+            lines = f.readlines(rows * 48)  # size hint, about rows lines
+            if not lines:
+                return
+            yield np.array(''.join(lines).split(), dtype=np.float64).reshape(len(lines), -1)
+
+def filter_file(src: str = "hw2/waveform.dat",
+                dst: str = "hw2/waveform_filtered.dat",
+                block: int = 4096,
+                threshold: float | None = 0.02,
+                band: Tuple[float, float] | None = None,
+                rows: int = 1 << 16) -> int:
+    '''filter the y column of a (t, y) text file into dst with bounded memory, returns the row count
+
+    threshold is in amplitude units. data() cuts at |X| = 100 over all
+    40000 samples, i.e. amplitude 0.005; a 4096 frame sees a noise floor
+    about 3 times higher, and 0.02 stays within 0.016 (rms) of the
+    global filter on waveform.dat.
+    '''
+    blocks = _text_blocks(src, rows)
+    first = next(blocks)
+    dt = first[1, 0] - first[0, 0]
+    blocks = chain([first], blocks)
+    pending = []  # t of rows read but not yet written
+    count = 0
+
+    def ys():
+        for b in blocks:
+            pending.append(b[:, 0])
+            yield b[:, 1]
+
+    with open(dst, "w") as f:
+        for y in wola(ys(), block, threshold, band, dt):
+            t = np.concatenate(pending)
+            pending[:] = [t[len(y):]]
+            np.savetxt(f, np.column_stack([t[:len(y)], y]), fmt="%.17g", delimiter="\t")
+            count += len(y)
+    return count
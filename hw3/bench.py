@@ -0,0 +1,57 @@
+import time
+import tracemalloc
+import numpy as np
+
+from ode.rk45 import *
+from pingpong import eqas, BallCrash
+import kapitza
+
+def _bench_buffered(te=20, step=0.001):
+    '''steps/sec and transient bytes per step of the plain vs buffered iterate'''
+    n = int(te / step)
+    for buffered in (False, True):
+        it = RK45FixedIterator(eqas, np.array([1.1, 0.]), 0, te,
+                               events=[BallCrash()], step=step, buffered=buffered)
+        start = time.perf_counter()
+        for _ in it:
+            pass
+        usage = time.perf_counter() - start
+
+        # peak of short-lived allocations inside a single step
+        it = RK45FixedIterator(eqas, np.array([1.1, 0.]), 0, te,
+                               events=[BallCrash()], step=step, buffered=buffered)
+        next(it)
+        tracemalloc.start()
+        peaks = []
+        for _ in range(1000):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            next(it)
+            peaks.append(tracemalloc.get_traced_memory()[1] - base)
+        tracemalloc.stop()
+
+        print(f"buffered={buffered}: {n / usage:.0f} steps/s, "
+              f"{1e6 * usage / n:.2f} us/step, "
+              f"{np.median(peaks):.0f} B transient/step")
+
+def _bench_tableaus(targets=(1e-4, 1e-7, 1e-10)):
+    '''RHS evaluations each tableau needs to reach a target error on the Kapitza pendulum'''
+    def f(t, y):
+        return kapitza.eqas(t, y, w=20)
+    y0 = np.array([np.pi * 4 / 5, 0])
+    ref = RK45FixedIterator(f, y0, 0, 10, constants='dop853', step=1e-4).solve()[1][-1]
+
+    print("tableau   " + "".join(f"{target:>10.0e}" for target in targets))
+    for name in TABLEAUS:
+        runs = []
+        for tol in 10.0 ** -np.arange(3, 14):
+            it = RK45AutoIterator(f, y0, 0, 10, constants=name, tol=tol, step=1e-2)
+            y = it.solve()[1][-1]
+            runs.append((np.max(np.abs(y - ref)), it.nfev))
+        cost = [min((nfev for err, nfev in runs if err <= target), default=None)
+                for target in targets]
+        print(f"{name:<10}" + "".join(f"{'-' if n is None else n:>10}" for n in cost))
+
+if __name__ == "__main__":
+    _bench_buffered()
+    _bench_tableaus()
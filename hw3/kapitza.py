@@ -1,7 +1,12 @@
 import matplotlib.pyplot as plt
 import numpy as np
+import threading
+from matplotlib import animation
+from matplotlib.figure import Figure
+from numba import njit
 
-from ode.rk45 import *
+from ode import *
+from ode.jit import rk45_jit
 
 def eqas(t, vars, g=1, l=1, a=0.1, w=20):
     res = np.zeros(2)
@@ -15,11 +20,57 @@ def eqa1(t, vars):
 def eqa2(t, vars, g, l, a, w):
     return (-g/l + a * w * w / l * np.cos(w * t)) * np.sin(vars[0])
 
-def ui(t0state=np.array([np.pi/2, 0]), g=1, l=1, a=0.1, w=5):
-    def eqas_para(t, vars):
-        return eqas(t, vars, g, l, a, w)
-    fig, axes = plt.subplots(1, 2, figsize=(8, 4))
-    ax1, ax2 = axes
+def accel(t, theta, g=1, l=1, a=0.1, w=20):
+    '''theta'' for ode.SymplecticIterator'''
+    return (-g/l + a * w * w / l * np.cos(w * t)) * np.sin(theta)
+
+@njit
+def eqas_jit(t, vars, g=1, l=1, a=0.1, w=20):
+    '''eqas for ode.jit.rk45_jit, pass (g, l, a, w) as args'''
+    res = np.empty(2)
+    res[0] = vars[1]
+    res[1] = (-g/l + a * w * w / l * np.cos(w * t)) * np.sin(vars[0])
+    return res
+
+def simu(w, t0state=(np.pi * 4 / 5, 0), g=1, l=1, a=0.1, te=10, dt=0.001):
+    '''theta on the grid t = 0, dt, ..., te for one grid point of ode.Sweep'''
+    res = rk45_jit(eqas_jit, np.array(t0state, dtype=np.float64), 0, te,
+                   args=(np.float64(g), np.float64(l), np.float64(a), np.float64(w)), step=dt)
+    return res.y[:, 0]
+
+class RingBuffer:
+    '''fixed capacity FIFO of rows between the integrating and the drawing thread
+
+    push never waits: when the reader falls behind, the oldest unread
+    rows are overwritten and counted in dropped.
+    '''
+    def __init__(self, capacity: int, dim: int):
+        self.buf = np.empty((capacity, dim))
+        self.head = 0  # rows written so far
+        self.tail = 0  # rows read so far
+        self.dropped = 0
+        self.lock = threading.Lock()
+
+    def push(self, rows: np.ndarray) -> None:
+        n = len(rows)
+        cap = len(self.buf)
+        with self.lock:
+            idx = np.arange(self.head + max(0, n - cap), self.head + n) % cap
+            self.buf[idx] = rows[-cap:]
+            self.head += n
+            if self.head - self.tail > cap:
+                self.dropped += self.head - self.tail - cap
+                self.tail = self.head - cap
+
+    def pop(self) -> np.ndarray:
+        '''all unread rows, oldest first'''
+        with self.lock:
+            rows = self.buf[np.arange(self.tail, self.head) % len(self.buf)]
+            self.tail = self.head
+        return rows
+
+def _axes(fig, te):
+    ax1, ax2 = fig.subplots(1, 2)
 
     # plot the trajectory
     ax1.set_xlim(-1, 1)
@@ -31,40 +82,104 @@ def ui(t0state=np.array([np.pi/2, 0]), g=1, l=1, a=0.1, w=5):
     ax1.grid()
 
     # plot the t-theta plot
-    ax2.set_xlim(0, 10)
+    ax2.set_xlim(0, te)
     ax2.set_ylim(-np.pi, np.pi)
     ax2.set_title('Theta-t')
     ax2.set_xlabel('t')
     ax2.set_ylabel('theta')
     ax2.grid()
 
-    dt = 0.001
-
-    # lists to store the trajectory and theta values
-    x_vals, y_vals = [], []
-    t_vals, theta_vals = [], []
-
     # circle to represent the pendulum
     circle, = ax1.plot([], [], 'bo', markersize=10, alpha = 0.02)
     line, = ax2.plot([], [], 'r-')
+    return circle, line
+
+def _draw(circle, line, t_vals, theta_vals, trail):
+    bob = theta_vals[-trail:] if trail else theta_vals
+    circle.set_data(np.sin(bob), -np.cos(bob))
+    line.set_data(t_vals, (theta_vals + np.pi) % (2 * np.pi) - np.pi)
+
+def ui(t0state=np.array([np.pi/2, 0]), g=1, l=1, a=0.1, w=5,
+       te=10, dt=0.001, mode='batch', fps=30, speed=1., decimate=10, trail=None, save=None):
+    '''integrate and plot the pendulum
+
+    mode='batch' integrates first and draws once. mode='animate' draws at
+    fps: live, a thread integrates into a RingBuffer and every frame shows
+    what has arrived, so drawing never holds the integration back; with
+    save, frames at sim time k * speed / fps are rendered off screen.
+    Only every decimate-th step is kept, trail limits the bob trace to
+    the last samples. save: a .png (batch), a .mp4 or a pattern like
+    figs/w5_%04d.png (animate); nothing is shown when saving.
+    '''
+    if mode not in ('batch', 'animate'):
+        raise ValueError(f"unknown mode {mode!r}, choose from ['batch', 'animate']")
+    def eqas_para(t, vars):
+        return eqas(t, vars, g, l, a, w)
+    it = RK45FixedIterator(eqas_para, np.asarray(t0state, dtype=np.float64), 0, te, step=dt, buffered=True)
+    # off screen figure, no display needed
+    fig = Figure(figsize=(8, 4)) if save is not None else plt.figure(figsize=(8, 4))
+    circle, line = _axes(fig, te)
+
+    if mode == 'batch':
+        t_vals, y = it.solve(save_every=decimate)
+        _draw(circle, line, t_vals, y[:, 0], trail)
+        if save is None:
+            plt.show()
+        else:
+            fig.savefig(save)
+        return
+
+    if save is not None:
+        t_vals, y = it.solve(save_every=decimate)
+        frames = np.searchsorted(t_vals, np.arange(0, te, speed / fps), side='right')
+        if save.endswith('.mp4'):
+            if not animation.writers.is_available('ffmpeg'):
+                raise RuntimeError('saving .mp4 needs ffmpeg')
+            writer = animation.FFMpegWriter(fps=fps)
+            with writer.saving(fig, save, dpi=100):
+                for k in frames:
+                    _draw(circle, line, t_vals[:k], y[:k, 0], trail)
+                    writer.grab_frame()
+        else:
+            for i, k in enumerate(frames):
+                _draw(circle, line, t_vals[:k], y[:k, 0], trail)
+                fig.savefig(save % i)
+        return
 
-    for t, y in RK45FixedIterator(eqas_para, t0state, 0, 10, step=dt):
-        theta = y[0]
-        xx = np.sin(y[0])
-        yy = -np.cos(y[0])
-        x_vals.append(xx)
-        y_vals.append(yy)
-        t_vals.append(t)
-        if abs(theta) > np.pi:
-            theta = (theta + np.pi) % (2 * np.pi) - np.pi
-        theta_vals.append(theta)
+    # live: theta history at display resolution, the integrator runs ahead in a thread
+    ring = RingBuffer(4096, 2)
+    t_vals = np.empty(int(te / dt) // decimate + 2)
+    theta_vals = np.empty_like(t_vals)
+    n = 0
+    def produce():
+        for t_c, y_c in it.run_chunks(256, save_every=decimate):
+            ring.push(np.column_stack([t_c, y_c[:, 0]]))
+    producer = threading.Thread(target=produce, daemon=True)
 
-        circle.set_data(x_vals, y_vals)
-        line.set_data(t_vals, theta_vals)
+    def update(frame):
+        nonlocal n
+        rows = ring.pop()[:len(t_vals) - n]
+        t_vals[n:n + len(rows)] = rows[:, 0]
+        theta_vals[n:n + len(rows)] = rows[:, 1]
+        n += len(rows)
+        _draw(circle, line, t_vals[:n], theta_vals[:n], trail)
+        if not producer.is_alive() and ring.head == ring.tail:
+            anim.event_source.stop()
+        return circle, line
 
+    anim = animation.FuncAnimation(fig, update, interval=1000 / fps, cache_frame_data=False)
+    producer.start()
     plt.show()
-    # plt.savefig(f"hw3/figs/w={w}.png")
 
 if __name__ == "__main__":
-    for i in range(5, 30, 5):
-        ui(np.array([np.pi * 4 / 5,0]), w=i)
\ No newline at end of file
+    w_list = np.arange(5, 30, 5)
+    theta = Sweep(simu, {'w': w_list}, {'theta': (10001,)}).run()['theta']
+    t_vals = np.linspace(0, 10, 10001)
+    fig, axes = plt.subplots(len(w_list), 1, figsize=(8, 2 * len(w_list)), sharex=True)
+    for ax, w, th in zip(axes, w_list, theta):
+        ax.plot(t_vals, (th + np.pi) % (2 * np.pi) - np.pi, 'r-')
+        ax.set(ylim=(-np.pi, np.pi), ylabel='theta', title=f'w={w}')
+        ax.grid()
+    axes[-1].set_xlabel('t')
+    plt.tight_layout()
+    plt.show()
\ No newline at end of file
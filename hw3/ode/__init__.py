@@ -1 +1,4 @@
-from .rk45 import *
\ No newline at end of file
+from .rk45 import *
+from .symplectic import *
+from .poincare import *
+from .sweep import *
\ No newline at end of file
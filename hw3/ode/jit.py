@@ -0,0 +1,259 @@
+'''numba backend: the whole RK integration loop in nopython mode
+
+Opt-in, not imported by the package: ``from ode.jit import rk45_jit``.
+f, event and apply must be @njit functions taking (t, y, *args).
+'''
+import numpy as np
+from numba import njit
+from typing import Callable
+
+from .rk45 import RK45Coefficients, tableau
+
+@njit
+def _no_event(t, y, *args):
+    return 1.
+
+@njit
+def _no_apply(t, y, *args):
+    return y
+
+@njit
+def _dense(theta, h, y_prev, y_new, k, f_new, p, out):
+    '''continuous extension from p, or cubic Hermite when p has no columns'''
+    if p.shape[1] == 0:
+        h00 = (1 + 2 * theta) * (1 - theta) ** 2
+        h10 = theta * (1 - theta) ** 2
+        h01 = theta ** 2 * (3 - 2 * theta)
+        h11 = theta ** 2 * (theta - 1)
+        for j in range(len(out)):
+            out[j] = h00 * y_prev[j] + h10 * h * k[0, j] + h01 * y_new[j] + h11 * h * f_new[j]
+        return
+    out[:] = y_prev
+    for i in range(k.shape[0]):
+        w = 0.
+        power = 1.
+        for j in range(p.shape[1]):
+            power *= theta
+            w += p[i, j] * power
+        if w != 0:
+            for j in range(len(out)):
+                out[j] += h * w * k[i, j]
+
+@njit
+def _integrate(f, g, apply, args, y0, t0, t1, h0, a, b, c, d, p, fsal, q,
+               adaptive, tol, rtol, max_step, min_step, beta,
+               has_event, direction, kill, xtol, save_every, size):
+    n = len(y0)
+    s = len(a)
+    k = np.zeros((s, n))
+    y = y0.copy()
+    y_prev = y0.copy()
+    y_tmp = np.zeros(n)
+    y4 = np.zeros(n)
+    y5 = np.zeros(n)
+    f_new = np.zeros(n)
+
+    out_t = np.empty(size)
+    out_y = np.empty((size, n))
+    out_t[0] = t0
+    out_y[0] = y
+    m = 1
+    ev_t = np.empty(16)
+    ev_y = np.empty((16, n))
+    ne = 0
+
+    nfev = 0
+    naccept = 0
+    nreject = 0
+    t = t0
+    h = h0
+    i = 0
+    n_fixed = int((t1 - t0) / h0)
+    alpha = 1 / q - 0.75 * beta
+    err_prev = 1e-4
+    have_f0 = False
+    g_prev = g(t, y, *args) if has_event else 1.
+    count = 0
+    stop = False
+
+    while not stop:
+        if adaptive and t >= t1 or not adaptive and i >= n_fixed:
+            break
+
+        # accept/reject loop
+        rejected = False
+        while True:
+            if adaptive:
+                if h < min_step:
+                    stop = True
+                    break
+                step = min(h, t1 - t)
+            else:
+                step = t0 + (i + 1) * h0 - t
+            if not have_f0:
+                k[0] = f(t, y, *args)
+                nfev += 1
+                have_f0 = True
+            for st in range(1, s):
+                y_tmp[:] = y
+                for j in range(st):
+                    if b[st, j] != 0:
+                        y_tmp += step * b[st, j] * k[j]
+                k[st] = f(t + a[st] * step, y_tmp, *args)
+            nfev += s - 1
+            y4[:] = y
+            y5[:] = y
+            for j in range(s):
+                y4 += step * c[j] * k[j]
+                y5 += step * d[j] * k[j]
+            if not adaptive:
+                error = 0.
+                break
+            error = 0.
+            for j in range(n):
+                scale = tol + rtol * max(abs(y[j]), abs(y4[j]))
+                error += ((y5[j] - y4[j]) / scale) ** 2
+            error = np.sqrt(error / n)
+            if error <= 1:
+                break
+            nreject += 1
+            rejected = True
+            h = step * max(0.2, 0.9 * error ** (-1 / q))
+        if stop:
+            break
+
+        naccept += 1
+        y_prev[:] = y
+        y[:] = y4
+        t_prev = t
+        t = t + step if adaptive else t0 + (i + 1) * h0
+
+        cut = False
+        if has_event:
+            g_new = g(t, y, *args)
+            if p.shape[1] == 0 and (g_prev == 0 or g_prev * g_new <= 0):
+                if fsal:
+                    f_new[:] = k[s - 1]
+                else:
+                    f_new[:] = f(t, y, *args)
+                    nfev += 1
+            ta, ga = t_prev, g_prev
+            if ga == 0:
+                # we start on the root, e.g. right after a cut: take the sign
+                # just inside the step, so a hop back across it within the
+                # step is still bracketed on (t_prev, t]
+                ta = t_prev + min(4 * xtol + 1e-9 * step, step / 2)
+                _dense((ta - t_prev) / step, step, y_prev, y, k, f_new, p, y_tmp)
+                ga = g(ta, y_tmp, *args)
+            if ga != 0 and ga * g_new <= 0 and direction * (g_new - ga) >= 0:
+                # Illinois on g along the dense output
+                tb, gb = t, g_new
+                if gb != 0:
+                    for _ in range(100):
+                        tc = (ta * gb - tb * ga) / (gb - ga)
+                        _dense((tc - t_prev) / step, step, y_prev, y, k, f_new, p, y_tmp)
+                        gc = g(tc, y_tmp, *args)
+                        if gc == 0:
+                            tb = tc
+                            break
+                        if gc * gb < 0:
+                            ta, ga = tb, gb
+                        else:
+                            ga /= 2
+                        tb, gb = tc, gc
+                        if abs(tb - ta) < xtol:
+                            break
+                _dense((tb - t_prev) / step, step, y_prev, y, k, f_new, p, y_tmp)
+
+                if ne == len(ev_t):
+                    ev_t = np.concatenate((ev_t, np.empty_like(ev_t)))
+                    ev_y = np.concatenate((ev_y, np.empty_like(ev_y)))
+                ev_t[ne] = tb
+                ev_y[ne] = y_tmp
+                ne += 1
+
+                t = tb
+                if kill:
+                    y[:] = y_tmp
+                    stop = True
+                else:
+                    y[:] = apply(tb, y_tmp, *args)
+                g_prev = 0.
+                cut = True
+            else:
+                g_prev = g_new
+
+        if fsal and not cut:
+            k[0] = k[s - 1]
+        else:
+            have_f0 = False
+        if not adaptive and not cut:
+            i += 1
+        if adaptive:
+            error = max(error, 1e-10)
+            delta = 0.9 * error ** -alpha * err_prev ** beta
+            delta = min(1. if rejected else 10., max(0.2, delta))
+            h = min(max_step, step * delta)
+            err_prev = max(error, 1e-4)
+
+        count += 1
+        if count % save_every == 0 or stop:
+            if m == len(out_t):
+                out_t = np.concatenate((out_t, np.empty_like(out_t)))
+                out_y = np.concatenate((out_y, np.empty_like(out_y)))
+            out_t[m] = t
+            out_y[m] = y
+            m += 1
+
+    return out_t[:m], out_y[:m], ev_t[:ne], ev_y[:ne], nfev, naccept, nreject
+
+class RK45JitResult:
+    '''output of rk45_jit'''
+    def __init__(self, t, y, t_events, y_events, nfev, naccept, nreject) -> None:
+        self.t = t
+        self.y = y
+        self.t_events = t_events  # event times
+        self.y_events = y_events  # states at the events, before apply
+        self.nfev = nfev
+        self.naccept = naccept
+        self.nreject = nreject
+
+def rk45_jit(f: Callable,
+             y0: np.ndarray,
+             t0: np.float64,
+             t1: np.float64,
+             args: tuple = (),
+             constants: str | RK45Coefficients = 'dopri5',
+             step: np.float64 = 1e-3,
+             tol: np.float64 | None = None,
+             rtol: np.float64 = 0.,
+             max_step: np.float64 = np.inf,
+             min_step: np.float64 = 1e-12,
+             beta: np.float64 = 0.04,
+             event: Callable | None = None,
+             apply: Callable | None = None,
+             direction: int = 0,
+             kill: bool = False,
+             xtol: np.float64 = 1e-12,
+             save_every: int = 1) -> RK45JitResult:
+    '''integrate f from t0 to t1 with the loop compiled by numba
+
+    tol=None steps with the fixed step, otherwise the step is adapted like
+    RK45AutoIterator. event(t, y, *args) is located like a RootEvent.g and
+    apply(t, y, *args) returns the state to continue from.
+    '''
+    constants = tableau(constants)
+    a, b, c, d = constants.get()
+    p = constants.p if constants.p is not None else np.zeros((len(a), 0))
+    y0 = np.asarray(y0, dtype=np.float64)
+    size = max(1024, int((t1 - t0) / step) // save_every + 2) if tol is None else 1024
+    res = _integrate(f, event if event is not None else _no_event,
+                     apply if apply is not None else _no_apply, tuple(args),
+                     y0, np.float64(t0), np.float64(t1), np.float64(step),
+                     np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64),
+                     np.asarray(c, dtype=np.float64), np.asarray(d, dtype=np.float64),
+                     np.asarray(p, dtype=np.float64), constants.fsal, constants.error_order,
+                     tol is not None, np.float64(0. if tol is None else tol), np.float64(rtol),
+                     np.float64(max_step), np.float64(min_step), np.float64(beta),
+                     event is not None, direction, kill, np.float64(xtol), save_every, size)
+    return RK45JitResult(*res)
@@ -0,0 +1,59 @@
+import numpy as np
+from typing import Callable, Tuple
+
+from .rk45 import RK45Iterator, _illinois
+
+def _collect(ts: list[np.ndarray], ys: list[np.ndarray], dim: int) -> Tuple[np.ndarray, np.ndarray]:
+    if not ts:
+        return np.empty(0), np.empty((0, dim))
+    return np.concatenate(ts), np.concatenate(ys)
+
+def stroboscope(it: RK45Iterator,
+                period: np.float64,
+                t_skip: np.float64 = 0.,
+                phase: np.float64 = 0.) -> Tuple[np.ndarray, np.ndarray]:
+    '''run it to the end, keeping only y at t = phase + m * period for t >= t_skip
+
+    Samples come from the dense output of each step, so memory is
+    O(samples) whatever the step count.
+    '''
+    ts, ys = [], []
+    for t, _ in it:
+        t_prev = it._t_prev
+        if t < t_skip:
+            continue
+        # sample times in (t_prev, t]
+        m0 = np.floor((t_prev - phase) / period) + 1
+        m1 = np.floor((t - phase) / period)
+        if m1 < m0:
+            continue
+        t_s = phase + period * np.arange(m0, m1 + 1)
+        t_s = t_s[t_s >= t_skip]
+        if len(t_s):
+            ts.append(t_s)
+            ys.append(it.dense(t_s))
+    return _collect(ts, ys, len(it.y))
+
+def poincare(it: RK45Iterator,
+             section: Callable[[np.float64, np.ndarray], np.float64],
+             direction: int = 0,
+             t_skip: np.float64 = 0.,
+             xtol: np.float64 = 1e-12) -> Tuple[np.ndarray, np.ndarray]:
+    '''run it to the end, keeping only the crossings of section(t, y) = 0 for t >= t_skip
+
+    Unlike a RootEvent the crossings are located without cutting the step.
+    direction: 0 for any sign change, 1 only for - to +, -1 only for + to -.
+    '''
+    ts, ys = [], []
+    g_prev = section(it.t, it.y)
+    for t, y in it:
+        g = section(t, y)
+        t_prev = it._t_prev
+        # g_prev == 0: the last crossing sat exactly on the previous step end
+        if t >= t_skip and g_prev != 0 and g_prev * g <= 0 and direction * (g - g_prev) >= 0:
+            tc = _illinois(lambda s: section(s, it.dense(s)), t_prev, g_prev, t, g, xtol)
+            if tc >= t_skip:
+                ts.append(np.array([tc]))
+                ys.append(it.dense(tc)[None])
+        g_prev = g
+    return _collect(ts, ys, len(it.y))
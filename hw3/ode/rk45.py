@@ -6,32 +6,68 @@ class RK45Coefficients:
     def __init__(self):
         self.a: np.ndarray  # 节点系数
         self.b: np.ndarray  # 权重系数矩阵
-        self.c: np.ndarray  # 4阶解系数
-        self.d: np.ndarray  # 5阶解系数
+        self.c: np.ndarray  # 高阶解系数 (推进用)
+        self.d: np.ndarray  # 低阶解系数 (误差估计用)
+        self.fsal: bool = False  # 最后一级等于下一步的第一级
+        self.p: np.ndarray | None = None  # 稠密输出系数, y(t+θh) = y + h k^T p [θ, θ², ...]
+        self.error_order: int = 5  # 误差估计的阶 + 1, 步长控制的指数为 1/error_order
     
     def get(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
         return self.a, self.b, self.c, self.d
 
+    def check(self, tol: np.float64 = 1e-12) -> None:
+        '''raise ValueError if the tableau is inconsistent'''
+        name = type(self).__name__
+        s = len(self.a)
+        if self.b.shape != (s, s) or self.c.shape != (s,) or self.d.shape != (s,):
+            raise ValueError(f"{name}: a, b, c, d shapes do not match")
+        if np.any(np.triu(self.b) != 0):
+            raise ValueError(f"{name}: b is not strictly lower triangular")
+        if np.any(np.abs(self.b.sum(axis=1) - self.a) > tol):
+            raise ValueError(f"{name}: rows of b do not sum to a")
+        if abs(self.c.sum() - 1) > tol or abs(self.d.sum() - 1) > tol:
+            raise ValueError(f"{name}: c or d does not sum to 1")
+        if self.fsal and (self.a[-1] != 1 or np.any(np.abs(self.b[-1] - self.c) > tol)):
+            raise ValueError(f"{name}: last stage is not f(t + h, y_new), cannot be FSAL")
+        if self.p is not None and (self.p.shape[0] != s
+                                   or np.any(np.abs(self.p.sum(axis=1) - self.c) > tol)):
+            raise ValueError(f"{name}: dense output does not match c at θ = 1")
+
 class DormandPrince(RK45Coefficients):
+    '''Dormand–Prince 5(4), FSAL, with dense output'''
     def __init__(self):
         super().__init__()
-        self.a = np.array([0, 1/5, 3/10, 4/5, 8/9, 1])
+        # the 7th stage is f(t + h, y_new), reused as the next step's 1st stage
+        self.a = np.array([0, 1/5, 3/10, 4/5, 8/9, 1, 1])
         self.b = np.array([
-            [0, 0, 0, 0, 0, 0],
-            [1/5, 0, 0, 0, 0, 0],
-            [3/40, 9/40, 0, 0, 0, 0],
-            [44/45, -56/15, 32/9, 0, 0, 0],
-            [19372/6561, -25360/2187, 64448/6561, -212/729, 0, 0],
-            [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656, 0]
+            [0, 0, 0, 0, 0, 0, 0],
+            [1/5, 0, 0, 0, 0, 0, 0],
+            [3/40, 9/40, 0, 0, 0, 0, 0],
+            [44/45, -56/15, 32/9, 0, 0, 0, 0],
+            [19372/6561, -25360/2187, 64448/6561, -212/729, 0, 0, 0],
+            [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656, 0, 0],
+            [35/384, 0, 500/1113, 125/192, -2187/6784, 11/84, 0]
+        ])
+        self.c = np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84, 0])
+        self.d = np.array([5179/57600, 0, 7571/16695, 393/640, -92097/339200, 187/2100, 1/40])
+        self.fsal = True
+        # Shampine's 4th order continuous extension
+        self.p = np.array([
+            [1, -8048581381/2820520608, 8663915743/2820520608, -12715105075/11282082432],
+            [0, 0, 0, 0],
+            [0, 131558114200/32700410799, -68118460800/10900136933, 87487479700/32700410799],
+            [0, -1754552775/470086768, 14199869525/1410260304, -10690763975/1880347072],
+            [0, 127303824393/49829197408, -318862633887/49829197408, 701980252875/199316789632],
+            [0, -282668133/205662961, 2019193451/616988883, -1453857185/822651844],
+            [0, 40617522/29380423, -110615467/29380423, 69997945/29380423]
         ])
-        self.c = np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84])
-        self.d = np.array([5179/57600, 0, 7571/16695, 393/640, -92097/339200, 187/2100])
 
 class CashKarp(RK45Coefficients):
+    '''Cash–Karp 5(4), no dense output'''
     def __init__(self):
         super().__init__()
-        self.__a = np.array([0, 1/5, 3/10, 3/5, 1, 7/8])
-        self.__b = np.array([
+        self.a = np.array([0, 1/5, 3/10, 3/5, 1, 7/8])
+        self.b = np.array([
             [0, 0, 0, 0, 0, 0],
             [1/5, 0, 0, 0, 0, 0],
             [3/40, 9/40, 0, 0, 0, 0],
@@ -39,8 +75,114 @@ class CashKarp(RK45Coefficients):
             [-11/54, 5/2, -70/27, 35/27, 0, 0],
             [1631/55296, 175/512, 575/13824, 44275/110592, 253/4096, 0]
         ])
-        self.__c = np.array([37/378, 0, 250/621, 125/594, 0, 512/1771])
-        self.__d = np.array([2825/27648, 0, 18575/48384, 13525/55296, 277/14336, 1/4])
+        self.c = np.array([37/378, 0, 250/621, 125/594, 0, 512/1771])
+        self.d = np.array([2825/27648, 0, 18575/48384, 13525/55296, 277/14336, 1/4])
+
+class BogackiShampine(RK45Coefficients):
+    '''Bogacki–Shampine 3(2), FSAL, with Hermite dense output; cheap low accuracy'''
+    def __init__(self):
+        super().__init__()
+        self.a = np.array([0, 1/2, 3/4, 1])
+        self.b = np.array([
+            [0, 0, 0, 0],
+            [1/2, 0, 0, 0],
+            [0, 3/4, 0, 0],
+            [2/9, 1/3, 4/9, 0]
+        ])
+        self.c = np.array([2/9, 1/3, 4/9, 0])
+        self.d = np.array([7/24, 1/4, 1/3, 1/8])
+        self.fsal = True
+        self.p = np.array([
+            [1, -4/3, 5/9],
+            [0, 1, -2/3],
+            [0, 4/3, -8/9],
+            [0, -1, 1]
+        ])
+        self.error_order = 3
+
+class DOP853(RK45Coefficients):
+    '''Dormand–Prince 8(5,3) of Hairer's DOP853, for long high accuracy runs
+
+    Only the 5th order embedded estimate is used for the error, and the
+    dense output (3 extra stages) is not provided.
+    '''
+    def __init__(self):
+        super().__init__()
+        self.a = np.array([0, 0.05260015195876773, 0.0789002279381516, 0.1183503419072274, 0.2816496580927726, 0.3333333333333333, 0.25, 0.3076923076923077, 0.6512820512820513, 0.6, 0.8571428571428571, 1.0])
+        self.b = np.zeros((12, 12))
+        self.b[1, 0] = 0.05260015195876773
+        self.b[2, 0] = 0.0197250569845379
+        self.b[2, 1] = 0.0591751709536137
+        self.b[3, 0] = 0.02958758547680685
+        self.b[3, 2] = 0.08876275643042054
+        self.b[4, 0] = 0.2413651341592667
+        self.b[4, 2] = -0.8845494793282861
+        self.b[4, 3] = 0.924834003261792
+        self.b[5, 0] = 0.037037037037037035
+        self.b[5, 3] = 0.17082860872947386
+        self.b[5, 4] = 0.12546768756682242
+        self.b[6, 0] = 0.037109375
+        self.b[6, 3] = 0.17025221101954405
+        self.b[6, 4] = 0.06021653898045596
+        self.b[6, 5] = -0.017578125
+        self.b[7, 0] = 0.03709200011850479
+        self.b[7, 3] = 0.17038392571223998
+        self.b[7, 4] = 0.10726203044637328
+        self.b[7, 5] = -0.015319437748624402
+        self.b[7, 6] = 0.008273789163814023
+        self.b[8, 0] = 0.6241109587160757
+        self.b[8, 3] = -3.3608926294469414
+        self.b[8, 4] = -0.868219346841726
+        self.b[8, 5] = 27.59209969944671
+        self.b[8, 6] = 20.154067550477894
+        self.b[8, 7] = -43.48988418106996
+        self.b[9, 0] = 0.47766253643826434
+        self.b[9, 3] = -2.4881146199716677
+        self.b[9, 4] = -0.590290826836843
+        self.b[9, 5] = 21.230051448181193
+        self.b[9, 6] = 15.279233632882423
+        self.b[9, 7] = -33.28821096898486
+        self.b[9, 8] = -0.020331201708508627
+        self.b[10, 0] = -0.9371424300859873
+        self.b[10, 3] = 5.186372428844064
+        self.b[10, 4] = 1.0914373489967295
+        self.b[10, 5] = -8.149787010746927
+        self.b[10, 6] = -18.52006565999696
+        self.b[10, 7] = 22.739487099350505
+        self.b[10, 8] = 2.4936055526796523
+        self.b[10, 9] = -3.0467644718982196
+        self.b[11, 0] = 2.273310147516538
+        self.b[11, 3] = -10.53449546673725
+        self.b[11, 4] = -2.0008720582248625
+        self.b[11, 5] = -17.9589318631188
+        self.b[11, 6] = 27.94888452941996
+        self.b[11, 7] = -2.8589982771350235
+        self.b[11, 8] = -8.87285693353063
+        self.b[11, 9] = 12.360567175794303
+        self.b[11, 10] = 0.6433927460157636
+        self.c = np.array([0.054293734116568765, 0, 0, 0, 0, 4.450312892752409, 1.8915178993145003, -5.801203960010585, 0.3111643669578199, -0.1521609496625161, 0.20136540080403034, 0.04471061572777259])
+        self.d = self.c - np.array([0.01312004499419488, 0, 0, 0, 0, -1.2251564463762044, -0.4957589496572502, 1.6643771824549864, -0.35032884874997366, 0.3341791187130175, 0.08192320648511571, -0.022355307863886294])
+        self.error_order = 6
+
+TABLEAUS: dict[str, RK45Coefficients] = {}
+
+def register(name: str, constants: RK45Coefficients) -> None:
+    '''validate a tableau and make it available by name'''
+    constants.check()
+    TABLEAUS[name] = constants
+
+def tableau(constants: str | RK45Coefficients) -> RK45Coefficients:
+    '''look a tableau up by name, instances are passed through'''
+    if isinstance(constants, RK45Coefficients):
+        return constants
+    if constants not in TABLEAUS:
+        raise ValueError(f"unknown tableau {constants!r}, choose from {list(TABLEAUS)}")
+    return TABLEAUS[constants]
+
+register('dopri5', DormandPrince())
+register('cashkarp', CashKarp())
+register('bs32', BogackiShampine())
+register('dop853', DOP853())
 
 class Event:
     def __init__(self, kill: bool = False) -> None:
@@ -52,6 +194,44 @@ class Event:
     def handle(self, t: np.float64, y4: np.ndarray, y5: np.ndarray, err: np.float64) -> None:
         raise NotImplementedError
 
+class RootEvent(Event):
+    '''event at a zero of g(t, y), located inside the step on the dense output
+
+    direction: 0 for any sign change, 1 only for - to +, -1 only for + to -.
+    '''
+    def __init__(self, kill: bool = False, direction: int = 0, xtol: np.float64 = 1e-12) -> None:
+        super().__init__(kill)
+        self.direction = direction
+        self.xtol = xtol
+
+    def g(self, t: np.float64, y: np.ndarray) -> np.float64:
+        raise NotImplementedError
+
+    def apply(self, t: np.float64, y: np.ndarray) -> np.ndarray:
+        '''state to continue from after the event'''
+        return y
+
+def _illinois(g: Callable[[np.float64], np.float64],
+              ta: np.float64, ga: np.float64,
+              tb: np.float64, gb: np.float64,
+              xtol: np.float64, maxiter: int = 100) -> np.float64:
+    '''root of g in [ta, tb] with g(ta) * g(tb) <= 0, by the Illinois method'''
+    if gb == 0:
+        return tb
+    for _ in range(maxiter):
+        tc = (ta * gb - tb * ga) / (gb - ga)
+        gc = g(tc)
+        if gc == 0:
+            return tc
+        if gc * gb < 0:
+            ta, ga = tb, gb
+        else:
+            ga /= 2
+        tb, gb = tc, gc
+        if abs(tb - ta) < xtol:
+            break
+    return tb
+
 class RK45Iterator():
     def __init__(self,
                  f: Callable[[np.float64, np.ndarray], np.ndarray],
@@ -59,18 +239,46 @@ class RK45Iterator():
                  t0: np.float64,
                  t1: np.float64,
                  events: list[Event] = [],
-                 constants: RK45Coefficients = DormandPrince()) -> None:
+                 constants: str | RK45Coefficients = 'dopri5',
+                 buffered: bool = False) -> None:
         self.f = f
         self.y0 = y0
         self.t0 = t0
         self.t1 = t1
         self.events = events
-        self.constants = constants
+        self.constants = tableau(constants)
         self.a, self.b, self.c, self.d = self.constants.get()
+        self.buffered = buffered
 
         self.t = t0
         self.y = y0
         self.i = 0
+        self.nfev = 0  # number of f evaluations
+        self.naccept = 0  # accepted steps
+        self.nreject = 0  # rejected steps
+        self._f0 = None  # f(t, y) of the current state when the tableau is FSAL
+        self._t_prev = t0  # last step, for dense output
+        self._h_prev = 0.
+        self._y_prev = y0
+        self._k_prev = None
+        self._y_end = y0  # y at the end of the last step, before any event
+        self._f_end = None  # f there, for the Hermite dense output
+        self._g = None  # RootEvent.g at the start of the step
+        self._stop = False
+        self.event = None  # the RootEvent that ended the last step, if any
+        if buffered:
+            # work buffers reused by every step; the yielded y is one of them,
+            # so callers must copy it if they keep it past the next step
+            n = len(y0)
+            self.y = np.array(y0, dtype=np.float64)
+            self._k = np.zeros((len(self.a), n))
+            self._sum = np.zeros(n)
+            self._ytmp = np.zeros(n)
+            self._y4 = np.zeros(n)
+            self._y5 = np.zeros(n)
+            self._y_prev = np.zeros(n)
+            self._y_end = np.zeros(n)
+            self._f0_buf = np.zeros(n)
     
     def __iter__(self):
         return self
@@ -79,67 +287,410 @@ class RK45Iterator():
         raise NotImplementedError
     
     def iterate(self, step) -> Tuple[np.ndarray, np.ndarray, np.float64]:
-        k = np.zeros((6, len(self.y)))
-        k[0] = self.f(self.t, self.y)
-        for i in range(1, 6):
+        self._t_prev, self._h_prev = self.t, step
+        self._f_end = None
+        if self.buffered:
+            return self._iterate_buffered(step)
+        k = np.zeros((len(self.a), len(self.y)))
+        k[0] = self._first_stage()
+        for i in range(1, len(self.a)):
             sum_bk = sum(self.b[i][j] * k[j] for j in range(i))
             k[i] = self.f(self.t + self.a[i] * step,
                           self.y + step * sum_bk)
+        self.nfev += len(self.a) - 1
+        self._k_prev = k
 
         y4 = self.y + step * np.dot(self.c, k)
         y5 = self.y + step * np.dot(self.d, k)
         error = np.linalg.norm(y5 - y4) / np.sqrt(len(self.y))
         return (y4, y5, error)
+
+    def _iterate_buffered(self, step) -> Tuple[np.ndarray, np.ndarray, np.float64]:
+        k, s, ytmp, y4, y5 = self._k, self._sum, self._ytmp, self._y4, self._y5
+        k[0] = self._first_stage()
+        for i in range(1, len(self.a)):
+            np.dot(self.b[i, :i], k[:i], out=s)
+            np.multiply(s, step, out=ytmp)
+            np.add(ytmp, self.y, out=ytmp)
+            k[i] = self.f(self.t + self.a[i] * step, ytmp)
+        self.nfev += len(self.a) - 1
+        self._k_prev = k
+
+        np.dot(self.c, k, out=y4)
+        np.multiply(y4, step, out=y4)
+        np.add(y4, self.y, out=y4)
+        np.dot(self.d, k, out=y5)
+        np.multiply(y5, step, out=y5)
+        np.add(y5, self.y, out=y5)
+        np.subtract(y5, y4, out=s)
+        error = np.sqrt(np.dot(s, s) / len(s))
+        return (y4, y5, error)
+
+    def _first_stage(self) -> np.ndarray:
+        if self._f0 is not None:
+            return self._f0
+        self.nfev += 1
+        return self.f(self.t, self.y)
+
+    def _update(self, y: np.ndarray, fsal: bool = True) -> None:
+        '''accept y as the new state; fsal=False when y is not the plain step result'''
+        if self.buffered:
+            np.copyto(self._y_prev, self.y)
+            np.copyto(self.y, y)
+            np.copyto(self._y_end, y)
+        else:
+            self._y_prev = self.y
+            self.y = y.copy()
+            self._y_end = self.y
+
+        if fsal and self.constants.fsal:
+            if self.buffered:
+                np.copyto(self._f0_buf, self._k_prev[-1])
+                self._f0 = self._f0_buf
+            else:
+                self._f0 = self._k_prev[-1]
+        else:
+            self._f0 = None
     
-    def _event_check(self, y4:np.ndarray, y5:np.ndarray, err:np.float64) -> None:
+    def _reset(self, t: np.float64, y: np.ndarray) -> None:
+        '''jump to (t, y) without a step, keeping the dense output of the last step'''
+        self.t = t
+        if self.buffered:
+            np.copyto(self.y, y)
+        else:
+            self.y = np.array(y, dtype=np.float64)
+        self._f0 = None
+
+    def _event_check(self, y4:np.ndarray, y5:np.ndarray, err:np.float64) -> bool:
+        '''accept the step at self.t; returns True if a RootEvent cut it short'''
+        handled = False
         for event in self.events:
+            if isinstance(event, RootEvent):
+                continue
             if event.detect(self.t, y4, y5, err):
                 if event.kill:
                     raise StopIteration
                 else:
                     self.t, y4, y5, err = event.handle(self.t, y4, y5, err)
-        self.y = y4.copy()
+                    handled = True
+        self._update(y4, not handled)
+        return self._root_check()
+
+    def _root_check(self) -> bool:
+        self.event = None
+        events = [event for event in self.events if isinstance(event, RootEvent)]
+        if not events:
+            return False
+        if self._g is None:
+            self._g = [event.g(self._t_prev, self._y_prev) for event in events]
+        g_new = [event.g(self.t, self.y) for event in events]
+
+        hit = None
+        for event, ga, gb in zip(events, self._g, g_new):
+            ta = self._t_prev
+            if ga == 0:
+                # we start on the root, e.g. right after handling it: take the
+                # sign just inside the step, so a hop back across it within
+                # the step is still bracketed on (t_prev, t]
+                ta += min(4 * event.xtol + 1e-9 * self._h_prev, self._h_prev / 2)
+                ga = event.g(ta, self.dense(ta))
+            if ga == 0 or ga * gb > 0 or event.direction * (gb - ga) < 0:
+                continue
+            te = _illinois(lambda t: event.g(t, self.dense(t)),
+                           ta, ga, self.t, gb, event.xtol)
+            if hit is None or te < hit[0]:
+                hit = (te, event)
+        if hit is None:
+            self._g = g_new
+            return False
+
+        te, self.event = hit
+        y = self.dense(te)
+        if self.event.kill:
+            self._stop = True
+        else:
+            y = self.event.apply(te, y)
+        self._reset(te, y)
+        self._g = [0. if event is self.event else event.g(te, self.y) for event in events]
+        return True
+
+    def dense(self, t: np.float64 | np.ndarray) -> np.ndarray:
+        '''continuous extension of the last step, for t in [t - step, t]
+
+        Events applied at the end of the step are not reflected. Tableaux
+        without p get a cubic Hermite on the step ends instead, which
+        costs one f evaluation per step unless the tableau is FSAL.
+        '''
+        p = self.constants.p
+        theta = (np.asarray(t) - self._t_prev) / self._h_prev
+        if p is None:
+            return self._hermite(theta)
+        q = np.dot(self._k_prev.T, p)
+        powers = np.power.outer(theta, np.arange(1, p.shape[1] + 1))
+        return self._y_prev + self._h_prev * np.dot(powers, q.T)
+
+    def _hermite(self, theta: np.float64 | np.ndarray) -> np.ndarray:
+        h = self._h_prev
+        if self._f_end is None:
+            if self.constants.fsal:
+                self._f_end = self._k_prev[-1]
+            else:
+                self._f_end = self.f(self._t_prev + h, self._y_end)
+                self.nfev += 1
+        theta = theta[..., None]
+        h00 = (1 + 2 * theta) * (1 - theta) ** 2
+        h10 = theta * (1 - theta) ** 2
+        h01 = theta ** 2 * (3 - 2 * theta)
+        h11 = theta ** 2 * (theta - 1)
+        return (h00 * self._y_prev + h10 * h * self._k_prev[0]
+                + h01 * self._y_end + h11 * h * self._f_end)
+
+    def _fill(self, t_buf: np.ndarray, y_buf: np.ndarray, j: int, save_every: int) -> Tuple[int, bool]:
+        '''store every save_every-th step into the buffers from row j on
+
+        returns the next free row and whether the iterator is exhausted;
+        the last state reached is always stored, even between saves
+        '''
+        unsaved = False  # a skipped step has moved the state past the last row
+        try:
+            while j < len(t_buf):
+                for _ in range(save_every - 1):
+                    self.__next__()
+                    unsaved = True
+                t_buf[j], y_buf[j] = self.__next__()
+                unsaved = False
+                j += 1
+        except StopIteration:
+            if unsaved:
+                # a row is free, the loop only skips steps while j < len(t_buf)
+                t_buf[j], y_buf[j] = self.t, self.y
+                j += 1
+            return j, True
+        return j, False
+
+    def run_chunks(self, chunk_size: int = 4096, save_every: int = 1):
+        '''yield (t, y) blocks of up to chunk_size saved steps, y with shape (m, dim)'''
+        finished = False
+        while not finished:
+            t_buf = np.empty(chunk_size)
+            y_buf = np.empty((chunk_size, len(self.y)))
+            j, finished = self._fill(t_buf, y_buf, 0, save_every)
+            if j:
+                yield t_buf[:j], y_buf[:j]
+
+    def solve(self, save_every: int = 1, chunk_size: int = 4096) -> Tuple[np.ndarray, np.ndarray]:
+        '''run to the end and return all saved (t, y), the current state first'''
+        # current state, the saves, a last partial save and a spare row, so
+        # an exact estimate sees StopIteration instead of growing the buffers
+        size = max(chunk_size, getattr(self, 'n', 0) // save_every + 3)
+        t_vals = np.empty(size)
+        y_vals = np.empty((size, len(self.y)))
+        t_vals[0], y_vals[0] = self.t, self.y
+        j, finished = self._fill(t_vals, y_vals, 1, save_every)
+        while not finished:
+            # grow geometrically, events may add steps past the estimate
+            t_vals = np.concatenate([t_vals, np.empty_like(t_vals)])
+            y_vals = np.concatenate([y_vals, np.empty_like(y_vals)])
+            j, finished = self._fill(t_vals, y_vals, j, save_every)
+        return t_vals[:j], y_vals[:j]
+
+    def sample(self, t_eval: np.ndarray) -> np.ndarray:
+        '''run the iterator to the end and return y on the sorted grid t_eval'''
+        t_eval = np.asarray(t_eval, dtype=np.float64)
+        res = np.full((len(t_eval), len(self.y)), np.nan)
+        j = np.searchsorted(t_eval, self.t, side='right')
+        res[:j] = self.y
+        for t, _ in self:
+            k = np.searchsorted(t_eval, t, side='right')
+            if k > j:
+                res[j:k] = self.dense(t_eval[j:k])
+                j = k
+        return res
     
 class RK45FixedIterator(RK45Iterator):
-    def __init__(self, f, y0, t0, t1, events = [], constants = DormandPrince(),
-                 step:float = 1e-3):
-        super().__init__(f, y0, t0, t1, events, constants)
+    def __init__(self, f, y0, t0, t1, events = [], constants = 'dopri5',
+                 step:float = 1e-3,
+                 buffered:bool = False):
+        super().__init__(f, y0, t0, t1, events, constants, buffered)
         self.step = step
         self.n = int((t1 - t0) / step)
     
     def __next__(self) -> Tuple[np.float64, np.ndarray]:
-        if self.i >= self.n:
+        if self._stop or self.i >= self.n:
             raise StopIteration
-        self.i += 1
-        self.t = self.t0 + (self.i) * self.step
-        y4, y5, err = self.iterate(self.step)
-        self._event_check(y4, y5, err)
+        # after a RootEvent the next step only runs up to the grid point
+        t_next = self.t0 + (self.i + 1) * self.step
+        y4, y5, err = self.iterate(t_next - self.t)
+        self.t = t_next
+        self.naccept += 1
+        if not self._event_check(y4, y5, err):
+            self.i += 1
         return (self.t, self.y)
 
 class RK45AutoIterator(RK45Iterator):
-    def __init__(self, f, y0, t0, t1, events = [], constants = DormandPrince(),
+    '''adaptive step with a PI (Gustafsson) controller
+
+    A step is accepted when the rms of (y5 - y4) / (tol + rtol * |y|) is at
+    most 1; tol and rtol may be arrays for per-component tolerances.
+    '''
+    def __init__(self, f, y0, t0, t1, events = [], constants = 'dopri5',
                  step:np.float64 = 1e-3,
-                 tol:np.float64 = 1e-6,
+                 tol:np.float64 | np.ndarray = 1e-6,
                  max_step:np.float64 = np.inf,
-                 min_step:np.float64 = 1e-12):
-        super().__init__(f, y0, t0, t1, events, constants)
+                 min_step:np.float64 = 1e-12,
+                 buffered:bool = False,
+                 rtol:np.float64 | np.ndarray = 0.,
+                 safety:np.float64 = 0.9,
+                 beta:np.float64 = 0.04):
+        super().__init__(f, y0, t0, t1, events, constants, buffered)
         self.tol = tol
+        self.rtol = rtol
         self.step = step
         self.max_step = max_step
         self.min_step = min_step
+        self.safety = safety
+        self.beta = beta  # weight of the previous error, 0 gives the plain I controller
+        self.alpha = 1 / self.constants.error_order - 0.75 * beta
+        self._err_prev = 1e-4
+
+    def _error(self, y4: np.ndarray, y5: np.ndarray) -> np.float64:
+        scale = self.tol + self.rtol * np.maximum(np.abs(self.y), np.abs(y4))
+        return np.sqrt(np.mean(((y5 - y4) / scale) ** 2))
 
     def __next__(self) -> Tuple[float, np.ndarray]:
-        if self.step < self.min_step or self.step > self.max_step:
+        if self._stop or self.t >= self.t1:
+            raise StopIteration
+
+        rejected = False
+        while True:
+            if self.step < self.min_step:
+                raise StopIteration
+            step = min(self.step, self.t1 - self.t)
+            y4, y5, _ = self.iterate(step)
+            error = self._error(y4, y5)
+            if error <= 1:
+                break
+            self.nreject += 1
+            rejected = True
+            self.step = step * max(0.2, self.safety * error ** (-1 / self.constants.error_order))
+
+        self.naccept += 1
+        self.t += step
+        self._event_check(y4, y5, error)
+
+        error = max(error, 1e-10)
+        delta = self.safety * error ** -self.alpha * self._err_prev ** self.beta
+        delta = min(1. if rejected else 10., max(0.2, delta))
+        self.step = min(self.max_step, step * delta)
+        self._err_prev = max(error, 1e-4)
+        return (self.t, self.y)
+
+class RK45BatchIterator():
+    '''integrate many initial conditions in lockstep
+
+    y0 has shape (n_traj, dim); f(t, y) takes t with shape (m,) and y with
+    shape (m, dim) and returns the (m, dim) derivatives of the m active rows.
+    Every trajectory keeps its own t and step. With tol=None the step is
+    fixed, otherwise it is adapted per trajectory like RK45AutoIterator.
+    Finished trajectories are masked out and no longer evaluated.
+    '''
+    def __init__(self,
+                 f: Callable[[np.ndarray, np.ndarray], np.ndarray],
+                 y0: np.ndarray,
+                 t0: np.float64 | np.ndarray,
+                 t1: np.float64 | np.ndarray,
+                 constants: str | RK45Coefficients = 'dopri5',
+                 step: np.float64 = 1e-3,
+                 tol: np.float64 | None = None,
+                 max_step: np.float64 = np.inf,
+                 min_step: np.float64 = 1e-12) -> None:
+        self.f = f
+        self.y0 = np.atleast_2d(np.asarray(y0, dtype=np.float64))
+        n_traj = self.y0.shape[0]
+        self.t0 = np.broadcast_to(np.asarray(t0, dtype=np.float64), (n_traj,)).copy()
+        self.t1 = np.broadcast_to(np.asarray(t1, dtype=np.float64), (n_traj,)).copy()
+        self.constants = tableau(constants)
+        self.a, self.b, self.c, self.d = self.constants.get()
+        self.tol = tol
+        self.max_step = max_step
+        self.min_step = min_step
+
+        self.t = self.t0.copy()
+        self.y = self.y0.copy()
+        self.step = np.full(n_traj, step, dtype=np.float64)
+        self.i = np.zeros(n_traj, dtype=np.int64)
+        # fixed stepping counts steps like RK45FixedIterator to avoid t drift
+        self.n = ((self.t1 - self.t0) / step).astype(np.int64)
+        self.active = self._active()
+        # FSAL: f of each accepted state, kept with the state it belongs to,
+        # since callers may edit y between steps (e.g. a bounce)
+        self._f0 = np.zeros_like(self.y)
+        self._y_f0 = np.full_like(self.y, np.nan)
+        self._k_last = None
+
+    def __iter__(self):
+        return self
+
+    def _active(self) -> np.ndarray:
+        if self.tol is None:
+            return self.i < self.n
+        return (self.t < self.t1) & (self.step >= self.min_step)
+
+    def iterate(self, idx: np.ndarray, step: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        t = self.t[idx]
+        y = self.y[idx]
+        h = step[:, None]
+        k = np.zeros((len(self.a),) + y.shape)
+        k_flat = k.reshape(len(self.a), -1)  # stage sums become one dot per stage
+        fresh = np.all(self._y_f0[idx] == y, axis=1) if self.constants.fsal else np.zeros(len(idx), dtype=bool)
+        k[0][fresh] = self._f0[idx[fresh]]
+        stale = ~fresh
+        if np.any(stale):
+            k[0][stale] = self.f(t[stale], y[stale])
+        for i in range(1, len(self.a)):
+            sum_bk = np.dot(self.b[i, :i], k_flat[:i]).reshape(y.shape)
+            k[i] = self.f(t + self.a[i] * step, y + h * sum_bk)
+        self._k_last = k[-1]
+
+        y4 = y + h * np.dot(self.c, k_flat).reshape(y.shape)
+        y5 = y + h * np.dot(self.d, k_flat).reshape(y.shape)
+        error = np.sqrt(np.sum((y5 - y4) ** 2, axis=1) / y.shape[1])
+        return (y4, y5, error)
+
+    def __next__(self) -> Tuple[np.ndarray, np.ndarray]:
+        '''advance every active trajectory by one attempted step'''
+        if not np.any(self.active):
             raise StopIteration
+        idx = np.flatnonzero(self.active)
+        t = self.t.copy()
+        y = self.y.copy()
 
-        y4, y5, error = self.iterate(self.step)
-        if error < self.tol:
-            self.t += self.step
-            self.y = y5.copy()
-            delta = 0.9 * (self.tol / error)**0.2
-            self.step = min(self.max_step, self.step * delta)
-            return (self.t, self.y)
+        if self.tol is None:
+            y4, y5, err = self.iterate(idx, self.step[idx])
+            self.i[idx] += 1
+            t[idx] = self.t0[idx] + self.i[idx] * self.step[idx]
+            y[idx] = y4
+            acc, y_acc, f_acc = idx, y4, self._k_last
         else:
-            delta = 0.9 * (self.tol / error)**0.25
-            self.step = max(0.1 * self.step, self.step * delta)
-            return self.__next__()
\ No newline at end of file
+            step = np.minimum(self.step[idx], self.t1[idx] - self.t[idx])
+            y4, y5, err = self.iterate(idx, step)
+            ok = err < self.tol
+            # same floor and growth cap as RK45AutoIterator, so a tiny error cannot blow the step up
+            err = np.maximum(err, 1e-10 * self.tol)
+            q = self.constants.error_order
+            delta = np.where(ok, np.minimum(10., 0.9 * (self.tol / err)**(1 / q)),
+                             np.maximum(0.1, 0.9 * (self.tol / err)**(1 / (q - 1))))
+            acc = idx[ok]
+            t[acc] = self.t[acc] + step[ok]
+            y[acc] = y4[ok]
+            self.step[idx] = np.minimum(self.max_step, step * delta)
+            y_acc, f_acc = y4[ok], self._k_last[ok]
+
+        if self.constants.fsal:
+            # the last stage is f(t + h, y_new) of every accepted row
+            self._f0[acc] = f_acc
+            self._y_f0[acc] = y_acc
+
+        self.t, self.y = t, y
+        self.active = self._active()
+        return (self.t, self.y)
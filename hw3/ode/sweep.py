@@ -0,0 +1,138 @@
+import os
+import numpy as np
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Tuple
+
+# per worker process: func, flat parameter arrays, result arrays, done flags
+_state: dict = {}
+
+def grid(**axes) -> Tuple[dict[str, np.ndarray], Tuple[int, ...]]:
+    '''cartesian product of the axes, flattened in C order, and its shape'''
+    axes = {name: np.atleast_1d(np.asarray(vals)) for name, vals in axes.items()}
+    mesh = np.meshgrid(*axes.values(), indexing='ij')
+    shape = tuple(len(vals) for vals in axes.values())
+    return {name: m.ravel() for name, m in zip(axes, mesh)}, shape
+
+def _fill(dtype: np.dtype):
+    return np.nan if np.issubdtype(dtype, np.inexact) else 0
+
+def _attach(func, params, specs, shm_names, path) -> None:
+    '''Pool initializer: map the result arrays into this worker'''
+    arrays = {}
+    if path is None:
+        # keep the SharedMemory objects alive as long as the arrays
+        _state['shm'] = [SharedMemory(name=shm_names[name]) for name in specs]
+        for shm, (name, (shape, dtype)) in zip(_state['shm'], specs.items()):
+            arrays[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        done = None
+    else:
+        for name in specs:
+            arrays[name] = np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r+')
+        done = np.load(os.path.join(path, 'done.npy'), mmap_mode='r+')
+    _state.update(func=func, params=params, arrays=arrays, done=done)
+
+def _work(index: np.ndarray) -> int:
+    '''run one chunk of flat grid indices, writing straight into the result arrays'''
+    func, params, arrays, done = _state['func'], _state['params'], _state['arrays'], _state['done']
+    for i in index:
+        res = func(**{name: vals[i] for name, vals in params.items()})
+        if not isinstance(res, dict):
+            res = dict(zip(arrays, res if isinstance(res, tuple) else (res,)))
+        for name, val in res.items():
+            val = np.asarray(val)
+            slot = arrays[name][i, ...]  # a view even for scalar outputs
+            slot[...] = _fill(slot.dtype)  # a resumed point may hold a partial earlier write
+            if val.ndim != slot.ndim or any(n > m for n, m in zip(val.shape, slot.shape)):
+                raise ValueError(f"output {name!r} of shape {val.shape} does not fit its slot {slot.shape}")
+            # shorter outputs (e.g. collision lists) stay padded with nan
+            slot[tuple(slice(0, n) for n in val.shape)] = val
+    if done is not None:
+        # results first, then the flags, so a killed run never marks a point it did not write
+        for arr in arrays.values():
+            arr.flush()
+        done[index] = True
+        done.flush()
+    return len(index)
+
+class Sweep:
+    '''run func(**point) over every point of a parameter grid on a process pool
+
+    outputs maps each result name to its per-point shape (and dtype);
+    func returns a dict, a tuple in the order of outputs, or a single
+    array. Workers write into shared memory (path=None) or into .npy
+    memmaps under path, so nothing is pickled back to the parent. With a
+    path the sweep is resumable: points already flagged in done.npy are
+    skipped.
+    '''
+    def __init__(self,
+                 func: Callable,
+                 axes: dict[str, np.ndarray],
+                 outputs: dict[str, Tuple[int, ...] | Tuple[Tuple[int, ...], np.dtype]],
+                 path: str | None = None,
+                 processes: int | None = None,
+                 chunk_size: int = 1):
+        self.func = func
+        self.params, self.shape = grid(**axes)
+        self.size = int(np.prod(self.shape))
+        self.specs = {}
+        for name, spec in outputs.items():
+            shape, dtype = spec if len(spec) == 2 and isinstance(spec[0], tuple) else (spec, np.float64)
+            self.specs[name] = ((self.size, *shape), np.dtype(dtype))
+        self.path = path
+        self.processes = processes if processes is not None else max(1, (os.cpu_count() or 1) - 2)
+        self.chunk_size = chunk_size
+
+    def _open(self, name: str, shape: Tuple[int, ...], dtype: np.dtype) -> np.ndarray:
+        file = os.path.join(self.path, f'{name}.npy')
+        if os.path.exists(file):
+            arr = np.load(file, mmap_mode='r+')
+            if arr.shape != shape or arr.dtype != dtype:
+                raise ValueError(f"checkpoint {file} has shape {arr.shape} {arr.dtype}, expected {shape} {dtype}")
+            return arr
+        arr = np.lib.format.open_memmap(file, mode='w+', dtype=dtype, shape=shape)
+        arr[:] = _fill(dtype)
+        arr.flush()
+        return arr
+
+    def run(self) -> dict[str, np.ndarray]:
+        '''results with shape grid shape + output shape'''
+        shms = {}
+        arrays = {}
+        if self.path is None:
+            todo = np.arange(self.size)
+            for name, (shape, dtype) in self.specs.items():
+                shms[name] = SharedMemory(create=True, size=max(1, int(np.prod(shape)) * dtype.itemsize))
+                arrays[name] = np.ndarray(shape, dtype=dtype, buffer=shms[name].buf)
+                arrays[name][:] = _fill(dtype)
+        else:
+            os.makedirs(self.path, exist_ok=True)
+            for name, (shape, dtype) in self.specs.items():
+                arrays[name] = self._open(name, shape, dtype)
+            done = self._open('done', (self.size,), np.dtype(bool))
+            todo = np.flatnonzero(~done)
+            arrays['done'] = done
+
+        try:
+            chunks = [todo[i:i + self.chunk_size] for i in range(0, len(todo), self.chunk_size)]
+            finished = self.size - len(todo)
+            if chunks:
+                with Pool(processes=min(self.processes, len(chunks)), initializer=_attach,
+                          initargs=(self.func, self.params, self.specs,
+                                    {name: shm.name for name, shm in shms.items()}, self.path)) as pool:
+                    for n in pool.imap_unordered(_work, chunks):
+                        finished += n
+                        print(f'{finished}/{self.size} points', end='\r')
+                print()
+            results = {}
+            for name in self.specs:
+                out = arrays[name]
+                # shared memory is released below, memmaps stay backed by the files
+                out = out.copy() if self.path is None else out
+                results[name] = out.reshape(self.shape + out.shape[1:])
+            return results
+        finally:
+            for name, shm in shms.items():
+                del arrays[name]
+                shm.close()
+                shm.unlink()
@@ -0,0 +1,99 @@
+import numpy as np
+from typing import Callable, Tuple
+
+from .rk45 import RK45FixedIterator, Event
+
+# substep weights of a composition of velocity Verlet steps
+_CBRT2 = 2 ** (1 / 3)
+SCHEMES: dict[str, list[float]] = {
+    'verlet': [1.],
+    'yoshida4': [1 / (2 - _CBRT2), -_CBRT2 / (2 - _CBRT2), 1 / (2 - _CBRT2)],
+}
+
+class SymplecticIterator(RK45FixedIterator):
+    '''fixed step symplectic integrator for q'' = accel(t, q) + force(t, q, v)
+
+    The state is y = [q, v] like the RK45 iterators, so events, solve(),
+    sample() etc. work unchanged. accel may depend on t (driven systems);
+    the optional force hook carries non-conservative terms such as drag,
+    evaluated explicitly in the kicks, so that part is only first order.
+    '''
+    def __init__(self,
+                 accel: Callable[[np.float64, np.ndarray], np.ndarray],
+                 y0: np.ndarray,
+                 t0: np.float64,
+                 t1: np.float64,
+                 events: list[Event] = [],
+                 scheme: str = 'verlet',
+                 step: np.float64 = 1e-2,
+                 force: Callable[[np.float64, np.ndarray, np.ndarray], np.ndarray] | None = None):
+        super().__init__(None, np.asarray(y0, dtype=np.float64), t0, t1, events, step=step)
+        if scheme not in SCHEMES:
+            raise ValueError(f"unknown scheme {scheme!r}, choose from {list(SCHEMES)}")
+        self.accel = accel
+        self.force = force
+        self.scheme = scheme
+        self.weights = SCHEMES[scheme]
+        self.dim = len(self.y) // 2
+        self._a = None  # accel(t, q) of the current state
+        self._a_start = None  # total acceleration at both ends of the last step
+        self._a_end = None
+
+    def _kick_accel(self, t: np.float64, q: np.ndarray, v: np.ndarray, a: np.ndarray) -> np.ndarray:
+        if self.force is None:
+            return a
+        return a + self.force(t, q, v)
+
+    def iterate(self, step) -> Tuple[np.ndarray, np.ndarray, np.float64]:
+        self._t_prev, self._h_prev = self.t, step
+        n = self.dim
+        t = self.t
+        q = self.y[:n].copy()
+        v = self.y[n:].copy()
+        if self._a is None:
+            self._a = self.accel(t, q)
+            self.nfev += 1
+        a = self._a
+        for k, w in enumerate(self.weights):
+            h = w * step
+            acc = self._kick_accel(t, q, v, a)
+            if k == 0:
+                self._a_start = acc
+            v += 0.5 * h * acc
+            q += h * v
+            t += h
+            a = self.accel(t, q)
+            self.nfev += 1
+            acc = self._kick_accel(t, q, v, a)
+            v += 0.5 * h * acc
+        self._a_end = acc
+        self._a_next = a
+        y = np.concatenate([q, v])
+        self._y_end = y.copy()
+        return (y, y, 0.)
+
+    def _update(self, y: np.ndarray, fsal: bool = True) -> None:
+        self._y_prev = self.y
+        self.y = y.copy()
+        # the last accel evaluation is the next step's first unless an event moved y
+        self._a = self._a_next if fsal else None
+        self._f0 = None
+
+    def _reset(self, t: np.float64, y: np.ndarray) -> None:
+        super()._reset(t, y)
+        self._a = None
+
+    def dense(self, t: np.float64 | np.ndarray) -> np.ndarray:
+        '''cubic Hermite on q (slopes v) and v (slopes a) over the last step'''
+        n = self.dim
+        h = self._h_prev
+        theta = (np.asarray(t) - self._t_prev) / h
+        theta = theta[..., None]
+        h00 = (1 + 2 * theta) * (1 - theta) ** 2
+        h10 = theta * (1 - theta) ** 2
+        h01 = theta ** 2 * (3 - 2 * theta)
+        h11 = theta ** 2 * (theta - 1)
+        y0, y1 = self._y_prev, self._y_end
+        dy0 = np.concatenate([y0[n:], self._a_start])
+        dy1 = np.concatenate([y1[n:], self._a_end])
+        return h00 * y0 + h10 * h * dy0 + h01 * y1 + h11 * h * dy1
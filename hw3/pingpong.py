@@ -1,27 +1,36 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from multiprocessing import Pool
-from ode.rk45 import *
-import os
-
-CPUNUM = os.cpu_count() - 2
+from ode import *
+from ode.jit import rk45_jit
+from numba import njit
+from pingpong2 import collide, y as flight
 
 G = 10
 A = 0.02
 W = 4 * np.pi
+N_HIT = 4096  # collision slots per sweep point
+
+def sweeppoint(y0, W=W, A=A, gamma=0.02):
+    '''collision map of [1800, 2000] and the time the ball settled, for one grid point of ode.Sweep'''
+    ct, cy, cv, count, t_stuck = collide(0, 2000, y0, 0, G, gamma, A, W, t_skip=1800)
+    return ct[0], cy[0], cv[0], t_stuck[0]
+
+def replay(t_vals, ct, cy, cv, t_stuck=np.inf, a=A, w=W, g=G, gamma=0.02):
+    '''heights at t_vals rebuilt from the collisions, nan before the first
 
-def worker(y0):
-    print(f'Processing y0={y0:.1f}...')
-    t_vals, y_vals, v_vals, ct_vals, cy_vals, cv_vals = simu(0, 2000, 0.001, y0, 0)
-    print(f'Finished y0={y0:.1f}!')
-    return (
-        np.array(t_vals), 
-        np.array(y_vals),
-        np.array(v_vals),
-        np.array(ct_vals),
-        np.array(cy_vals),
-        np.array(cv_vals)
-    )
+    From t_stuck on the ball rides the racket, also when it settled
+    before the first recorded collision.
+    '''
+    n = np.count_nonzero(~np.isnan(ct))
+    y_vals = np.full(np.shape(t_vals), np.nan)
+    if n:
+        ct, cy, cv = ct[:n], cy[:n], cv[:n]
+        k = np.searchsorted(ct, t_vals, side='right') - 1
+        ok = k >= 0
+        k = np.maximum(k, 0)
+        v_after = -cv[k] + 2 * a * w * np.cos(w * ct[k])
+        y_vals = np.where(ok, flight(t_vals, ct[k], cy[k], v_after, g, gamma), np.nan)
+    return np.where(t_vals >= t_stuck, a * np.sin(w * t_vals), y_vals)
 
 # vars: y, vy
 def eqas(t, vars, g=G, gamma=0.02):
@@ -34,6 +43,13 @@ def eqa1(t, vars):
 def eqa2(t, vars, g, gamma):
     return -g - gamma * vars[1]
 
+# vars: (n_traj, 2) rows of y, vy
+def eqas_batch(t, vars, g=G, gamma=0.02):
+    res = np.empty_like(vars)
+    res[:, 0] = vars[:, 1]
+    res[:, 1] = -g - gamma * vars[:, 1]
+    return res
+
 class BallCrash(Event):
     def __init__(self, kill = False):
         super().__init__(kill)
@@ -46,6 +62,91 @@ class BallCrash(Event):
         y4[0] = A * np.sin(W * t) + 1e-8
         return t, y4, y5, err
 
+class BallHit(RootEvent):
+    '''racket impact located on the dense output, g = y - racket'''
+    def __init__(self, kill = False):
+        super().__init__(kill, direction=-1)
+        self.hits = []  # (t, y, v) just before each bounce
+
+    def g(self, t, y):
+        return y[0] - A * np.sin(W * t)
+
+    def apply(self, t, y):
+        self.hits.append((t, y[0], y[1]))
+        y = y.copy()
+        y[1] = -y[1] + 2 * A * W * np.cos(W * t)  # bounce
+        y[0] = A * np.sin(W * t)
+        return y
+
+def rootsimu(ts, te, tol, y0, v0):
+    '''adaptive simu, impacts located exactly by BallHit'''
+    hit = BallHit()
+    # keep steps under an eighth of the racket period so no crossing pair is skipped
+    it = RK45AutoIterator(eqas, np.array([y0, v0], dtype=np.float64), ts, te,
+                          events=[hit], tol=tol, max_step=np.pi / W / 4)
+    t_vals = [ts]
+    y_vals = [y0]
+    v_vals = [v0]
+    for t, y in it:
+        t_vals.append(t)
+        y_vals.append(y[0])
+        v_vals.append(y[1])
+    ct_vals, cy_vals, cv_vals = np.array(hit.hits).reshape(-1, 3).T
+    return np.array(t_vals), np.array(y_vals), np.array(v_vals), ct_vals, cy_vals, cv_vals
+
+def accel(t, y, g=G):
+    return np.array([-g])
+
+def drag(t, y, v, gamma=0.02):
+    return -gamma * v
+
+def symsimu(ts, te, step, y0, v0, scheme='yoshida4'):
+    '''simu with a symplectic integrator, impacts located by BallHit'''
+    hit = BallHit()
+    it = SymplecticIterator(accel, np.array([y0, v0], dtype=np.float64), ts, te,
+                            events=[hit], scheme=scheme, step=step, force=drag)
+    t_vals, state = it.solve()
+    ct_vals, cy_vals, cv_vals = np.array(hit.hits).reshape(-1, 3).T
+    return t_vals, state[:, 0], state[:, 1], ct_vals, cy_vals, cv_vals
+
+def mapsimu(ts, te, tol, y0, v0, t_skip=1800, window=10, dt=0.001):
+    '''collision map after t_skip and the trajectory of the last window only
+
+    Memory is O(collisions + window / dt) instead of O(steps).
+    '''
+    hit = BallHit()
+    it = RK45AutoIterator(eqas, np.array([y0, v0], dtype=np.float64), ts, te,
+                          events=[hit], tol=tol, max_step=np.pi / W / 4)
+    t_vals, state = stroboscope(it, dt, t_skip=te - window)
+    ct_vals, cy_vals, cv_vals = np.array(hit.hits).reshape(-1, 3).T
+    keep = ct_vals >= t_skip
+    return t_vals, state[:, 0], state[:, 1], ct_vals[keep], cy_vals[keep], cv_vals[keep]
+
+@njit
+def eqas_jit(t, vars, g=G, gamma=0.02):
+    res = np.empty(2)
+    res[0] = vars[1]
+    res[1] = -g - gamma * vars[1]
+    return res
+
+@njit
+def racket_gap(t, vars):
+    return vars[0] - A * np.sin(W * t)
+
+@njit
+def bounce(t, vars):
+    res = vars.copy()
+    res[1] = -vars[1] + 2 * A * W * np.cos(W * t)
+    res[0] = A * np.sin(W * t)
+    return res
+
+def jitsimu(ts, te, tol, y0, v0):
+    '''rootsimu with the integration loop compiled by numba'''
+    res = rk45_jit(eqas_jit, np.array([y0, v0], dtype=np.float64), ts, te, tol=tol,
+                   max_step=np.pi / W / 4, event=racket_gap, apply=bounce, direction=-1)
+    return (res.t, res.y[:, 0], res.y[:, 1],
+            res.t_events, res.y_events[:, 0], res.y_events[:, 1])
+
 def autosimu(ts, te, err, y0, v0):
     t_vals = [ts]
     y_vals = [y0]
@@ -73,34 +174,114 @@ def autosimu(ts, te, err, y0, v0):
     return t_vals, y_vals, v_vals, ct_vals, cy_vals, cv_vals
 
 def simu(ts, te, step, y0, v0):
-    t_vals = np.zeros(int((te - ts) / step) + 1, dtype = np.float64)
-    y_vals = np.zeros(int((te - ts) / step) + 1, dtype = np.float64)
-    v_vals = np.zeros(int((te - ts) / step) + 1, dtype = np.float64)
+    it = RK45FixedIterator(eqas, np.array([y0, v0], dtype=np.float64), ts, te, events=[BallCrash()], step=step, buffered=True)
+    t_vals, state = it.solve()
+    y_vals = state[:, 0]
+    v_vals = state[:, 1]
     ct_vals = np.zeros_like(t_vals, dtype = np.float64)
     cy_vals = np.zeros_like(y_vals, dtype = np.float64)
     cv_vals = np.zeros_like(v_vals, dtype = np.float64)
+
+    # record crush
+    crush = np.flatnonzero((v_vals[1:] > 0) & (v_vals[:-1] < 0)) + 1
+    ct_vals[crush] = t_vals[crush - 1]
+    cy_vals[crush] = y_vals[crush - 1]
+    cv_vals[crush] = v_vals[crush - 1]
+
+    return t_vals, y_vals, v_vals, ct_vals, cy_vals, cv_vals
+
+def batchsimu(ts, te, step, y0_list, v0):
+    '''simu for every y0 in y0_list at once, one column per trajectory'''
+    y0_list = np.asarray(y0_list, dtype=np.float64)
+    n = int((te - ts) / step) + 1
+    shape = (n, len(y0_list))
+    t_vals = np.zeros(n, dtype = np.float64)
+    y_vals = np.zeros(shape, dtype = np.float64)
+    v_vals = np.zeros(shape, dtype = np.float64)
+    ct_vals = np.zeros(shape, dtype = np.float64)
+    cy_vals = np.zeros(shape, dtype = np.float64)
+    cv_vals = np.zeros(shape, dtype = np.float64)
     t_vals[0] = ts
-    y_vals[0] = y0
+    y_vals[0] = y0_list
     v_vals[0] = v0
 
     index = 0
+    state = np.stack([y0_list, np.full_like(y0_list, v0)], axis=1)
+    it = RK45BatchIterator(eqas_batch, state, ts, te, step=step)
+    for t, y in it:
+        # same bounce as BallCrash, applied row-wise
+        racket = A * np.sin(W * t)
+        crash = y[:, 0] < racket
+        y[crash, 1] = -y[crash, 1] + 2 * A * W * np.cos(W * t[crash])
+        y[crash, 0] = racket[crash] + 1e-8
 
-    for t, y in RK45FixedIterator(eqas, np.array([y_vals[0], v_vals[0]], dtype=np.float64), ts, te, events=[BallCrash()], step=step):
         index += 1
-        t_vals[index] = t
-        y_vals[index] = y[0]
-        v_vals[index] = y[1]
-        
+        t_vals[index] = t[0]
+        y_vals[index] = y[:, 0]
+        v_vals[index] = y[:, 1]
+
         # record crush
-        if v_vals[index] > 0 and v_vals[index - 1] < 0:
-            ct_vals[index] = t_vals[index - 1]
-            cy_vals[index] = y_vals[index - 1]
-            cv_vals[index] = v_vals[index - 1]
-        
+        rec = (v_vals[index] > 0) & (v_vals[index - 1] < 0)
+        ct_vals[index, rec] = t_vals[index - 1]
+        cy_vals[index, rec] = y_vals[index - 1, rec]
+        cv_vals[index, rec] = v_vals[index - 1, rec]
+
     return t_vals, y_vals, v_vals, ct_vals, cy_vals, cv_vals
 
+class Floor(RootEvent):
+    '''elastic floor at y = 0, g = y'''
+    def __init__(self):
+        super().__init__(direction=-1)
+        self.hits = 0
+
+    def g(self, t, y):
+        return y[0]
+
+    def apply(self, t, y):
+        self.hits += 1
+        y = y.copy()
+        y[1] = -y[1]
+        return y
+
+@njit
+def fall_jit(t, vars):
+    res = np.empty(2)
+    res[0] = vars[1]
+    res[1] = -G
+    return res
+
+@njit
+def floor_gap(t, vars):
+    return vars[0]
+
+@njit
+def floor_bounce(t, vars):
+    res = vars.copy()
+    res[1] = -vars[1]
+    return res
+
+def _short_hop_test(h0=1e-3, te=1., step=0.05):
+    '''a ball hopping h0 high bounces many times within one step and must never tunnel through the floor'''
+    f = lambda t, y: np.array([y[1], -G])
+    n_hops = int((te - np.sqrt(2 * h0 / G)) / np.sqrt(8 * h0 / G)) + 1
+    for c in ['dopri5', 'cashkarp', 'bs32', 'dop853']:
+        for it in (RK45FixedIterator(f, np.array([h0, 0.]), 0, te, events=[Floor()], constants=c, step=step),
+                   RK45AutoIterator(f, np.array([h0, 0.]), 0, te, events=[Floor()], constants=c, tol=1e-10)):
+            _, state = it.solve()
+            name = f"{type(it).__name__} {c}"
+            assert state[:, 0].min() > -1e-9, f"{name}: tunnelled to y = {state[:, 0].min():.3g}"
+            assert it.events[0].hits == n_hops, f"{name}: {it.events[0].hits} bounces, expected {n_hops}"
+        for tol in (None, 1e-10):
+            res = rk45_jit(fall_jit, np.array([h0, 0.]), 0, te, constants=c, step=step, tol=tol,
+                           event=floor_gap, apply=floor_bounce, direction=-1)
+            name = f"rk45_jit {c} tol={tol}"
+            assert res.y[:, 0].min() > -1e-9, f"{name}: tunnelled to y = {res.y[:, 0].min():.3g}"
+            assert len(res.t_events) == n_hops, f"{name}: {len(res.t_events)} bounces, expected {n_hops}"
+    print(f"{n_hops} bounces kept above the floor")
+
 
 if __name__ == "__main__":
+    _short_hop_test()
     fig, axes = plt.subplots(1, 2, figsize=(20,10))
     plt.rcParams['font.size'] = 16
 
@@ -110,18 +291,19 @@ if __name__ == "__main__":
     axes[0].axhline(0, color='black', lw=1)
 
     y0_list = np.arange(0.1, 5, 0.2)
-    with Pool(processes=CPUNUM) as pool:
-        results = pool.map(worker, y0_list)
+    # pass path= to checkpoint into .npy files and resume an interrupted sweep
+    res = Sweep(sweeppoint, {'y0': y0_list},
+                {'ct': (N_HIT,), 'cy': (N_HIT,), 'cv': (N_HIT,), 't_stuck': ()}).run()
 
-    for idx, (t_vals, y_vals, v_vals, ct_vals, cy_vals, cv_vals) in enumerate(results):
-        mask = (t_vals >= 1990) & (t_vals <= 2000)
-        axes[0].plot(t_vals[mask] - 1990, y_vals[mask], 
+    t_vals = np.arange(1990, 2000, 0.001)
+    for idx, (ct_vals, cy_vals, cv_vals, t_stuck) in enumerate(zip(res['ct'], res['cy'], res['cv'], res['t_stuck'])):
+        y_vals = replay(t_vals, ct_vals, cy_vals, cv_vals, t_stuck)
+        axes[0].plot(t_vals - 1990, y_vals, 
                     alpha=0.5,
                     label=f'y0={y0_list[idx]:.1f}')
 
-        mask_collision = (ct_vals != 0) & (ct_vals >= 1800)
-        axes[1].scatter(cy_vals[mask_collision], 
-                       cv_vals[mask_collision], 
+        axes[1].scatter(cy_vals, 
+                       cv_vals, 
                        s=5, 
                        alpha=0.2)
 
@@ -11,6 +11,132 @@ def y(t, t0, y0, v0, g=10, gamma=0.02):
 def v(t, t0, y0, v0, g=10, gamma=0.02):
     return - g / gamma + (v0 + g / gamma) * np.exp(-gamma * (t - t0))
 
+A = 0.02
+W = 4 * np.pi
+
+def racket(t, a=A, w=W):
+    return a * np.sin(w * t)
+
+def _scan_step(t, t0, y0, v0, t_top, delta, g, gamma, a):
+    '''next scan point; the stretch where the ball is above the racket band is skipped'''
+    t_next = t + delta
+    # y is concave, so y > a only between its two crossings of a
+    return np.where(y(t_next, t0, y0, v0, g, gamma) > a, np.maximum(t_next, t_top), t_next)
+
+def _fall_time(t0, y0, v0, level, g, gamma):
+    '''time the ball falls back through level, or the apex time if it never gets above it'''
+    t_apex = t0 + np.log1p(gamma * np.maximum(v0, 0) / g) / gamma
+    y_apex = y(t_apex, t0, y0, v0, g, gamma)
+    # bracket from the right, then Newton, which is monotone on the concave falling branch
+    dt = np.sqrt(2 * np.maximum(y_apex - level, 0) / g) + 1e-3
+    while True:
+        above = y(t_apex + dt, t0, y0, v0, g, gamma) > level
+        if not np.any(above):
+            break
+        dt = np.where(above, 2 * dt, dt)
+    t = t_apex.copy()
+    j = np.flatnonzero(y_apex > level)
+    t0, y0, v0, tj = t0[j], y0[j], v0[j], t_apex[j] + dt[j]
+    for _ in range(100):
+        step = (y(tj, t0, y0, v0, g, gamma) - level) / v(tj, t0, y0, v0, g, gamma)
+        tj = tj - step
+        if np.all(np.abs(step) <= 1e-12):
+            break
+    t[j] = tj
+    return t
+
+def collide(ts, te, y0, v0, g=10, gamma=0.02, a=A, w=W, t_skip=0., xtol=1e-13, n_scan=16, v_stick=1e-2):
+    '''racket impacts in [ts, te] of many balls at once, from the closed-form flight
+
+    Between bounces the next crossing of the racket is bracketed on a grid
+    of n_scan points per racket period, skipping the part of the flight
+    above the band [-a, a], and refined by a Newton/bisection hybrid.
+    A ball leaving the racket slower than v_stick (relative speed) has
+    settled onto it through ever shorter bounces; if a * w**2 < g it then
+    rides the racket and is dropped instead of chattering forever. A
+    racket that accelerates down faster than g throws a settled ball off
+    again, so then no ball is dropped and v_stick is ignored.
+    Returns ct, cy, cv (impact time, height and velocity before the bounce)
+    with shape (n_traj, n_max), padded with nan, the count per ball and
+    t_stuck, the time each ball was dropped (inf if it never was); from
+    then on it moves with the racket.
+    '''
+    y0, v0 = np.broadcast_arrays(np.asarray(y0, dtype=np.float64), np.asarray(v0, dtype=np.float64))
+    y0 = y0.ravel().copy()
+    v0 = v0.ravel().copy()
+    n_traj = len(y0)
+    t0 = np.full(n_traj, ts, dtype=np.float64)
+    if a * w ** 2 >= g:
+        v_stick = 0.  # relative speeds after a bounce are >= 0, no ball retires
+    delta = 2 * np.pi / w / n_scan
+
+    size = 64
+    ct = np.full((n_traj, size), np.nan)
+    cy = np.full((n_traj, size), np.nan)
+    cv = np.full((n_traj, size), np.nan)
+    count = np.zeros(n_traj, dtype=np.int64)
+    t_stuck = np.full(n_traj, np.inf)
+    active = np.arange(n_traj)
+
+    def gap(t, idx):
+        return y(t, t0[idx], y0[idx], v0[idx], g, gamma) - racket(t, a, w)
+
+    def dgap(t, idx):
+        return v(t, t0[idx], y0[idx], v0[idx], g, gamma) - a * w * np.cos(w * t)
+
+    while len(active):
+        idx = active
+        t_top = _fall_time(t0[idx], y0[idx], v0[idx], a, g, gamma)
+
+        # bracket: lo is the last scan point above the racket, hi the first below
+        lo = t0[idx].copy()
+        hi = lo.copy()
+        todo = np.ones(len(idx), dtype=bool)
+        while np.any(todo):
+            j = np.flatnonzero(todo)
+            lo[j] = hi[j]
+            hi[j] = _scan_step(lo[j], t0[idx[j]], y0[idx[j]], v0[idx[j]], t_top[j], delta, g, gamma, a)
+            todo[j] = (gap(hi[j], idx[j]) > 0) & (lo[j] < te)
+
+        # Newton/bisection hybrid on [lo, hi]
+        t = hi.copy()
+        for _ in range(100):
+            h = gap(t, idx)
+            pos = h > 0
+            lo = np.where(pos, t, lo)
+            hi = np.where(pos, hi, t)
+            t_new = t - h / dgap(t, idx)
+            bad = ~((t_new > lo) & (t_new < hi))
+            t_new = np.where(bad, 0.5 * (lo + hi), t_new)
+            done = (np.abs(t_new - t) < xtol) | (hi - lo < xtol)
+            t = t_new
+            if np.all(done):
+                break
+
+        hit = t <= te
+        idx, t = idx[hit], t[hit]
+        yi = racket(t, a, w)
+        vi = v(t, t0[idx], y0[idx], v0[idx], g, gamma)
+        rec = t >= t_skip
+        if np.any(count[idx[rec]] >= ct.shape[1]):
+            pad = np.full((n_traj, ct.shape[1]), np.nan)
+            ct, cy, cv = (np.concatenate([arr, pad], axis=1) for arr in (ct, cy, cv))
+        ct[idx[rec], count[idx[rec]]] = t[rec]
+        cy[idx[rec], count[idx[rec]]] = yi[rec]
+        cv[idx[rec], count[idx[rec]]] = vi[rec]
+        count[idx[rec]] += 1
+
+        # bounce
+        t0[idx] = t
+        y0[idx] = yi
+        v0[idx] = -vi + 2 * a * w * np.cos(w * t)
+        keep = v0[idx] - a * w * np.cos(w * t) >= v_stick
+        t_stuck[idx[~keep]] = t[~keep]
+        active = idx[keep]
+
+    n_max = count.max(initial=0)
+    return ct[:, :n_max], cy[:, :n_max], cv[:, :n_max], count, t_stuck
+
 def loop(ts, te, y0, v0):
     ct_vals = []
     cy_vals = []
@@ -37,7 +163,8 @@ def loop(ts, te, y0, v0):
     return np.array(ct_vals), np.array(cy_vals), np.array(cv_vals)
 
 if __name__ == "__main__":
-    ct_vals, cy_vals, cv_vals = loop(0, 2000, 0.3, 0)
+    ct_vals, cy_vals, cv_vals, count, t_stuck = collide(0, 2000, 0.3, 0)
+    ct_vals, cy_vals, cv_vals = ct_vals[0], cy_vals[0], cv_vals[0]
 
     mask = (ct_vals >= 1990) & (ct_vals <= 2000)
     plt.plot(ct_vals[mask] - 1990, cy_vals[mask], 
@@ -50,6 +177,6 @@ if __name__ == "__main__":
                 s=5, 
                 alpha=0.2)
 
-    plt.set(xlabel='Height (m)', ylabel='Velocity (m/s)', title='Phase Space')
+    plt.gca().set(xlabel='Height (m)', ylabel='Velocity (m/s)', title='Phase Space')
     plt.tight_layout(pad=5)
     plt.show()
\ No newline at end of file
@@ -2,6 +2,10 @@ import matplotlib.pyplot as plt
 import numpy as np
 import os
 import re
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "hw2"))
+from dft import rfft2, irfft2
 
 def txt_list(path="./hw7/data"):
     return [f for f in os.listdir(path) if f.endswith('.txt') and f.startswith("lattice")]
@@ -10,14 +14,12 @@ def corr_func(m1:np.ndarray, m2:np.ndarray) -> np.ndarray:
     """
     calculate the correlation function between two matrices.
     $Cuv (r) = <su(R) * sv(R+r)>$
+    periodic in both axes, computed via the cross spectrum conj(F1) F2;
+    leading axes are batched, so a stack of lattices goes in one pass.
     """
-    corr_matrix = np.zeros_like(m1)
-    for i in range(m1.shape[0]):
-        for j in range(m1.shape[1]):
-            newm2 = np.roll(m2, -j, axis=1)
-            newm2 = np.roll(newm2, -i, axis=0)
-            corr_matrix[i, j] = np.sum(m1 * newm2) / m1.size
-    return corr_matrix
+    size = m1.shape[-2] * m1.shape[-1]
+    cross = np.conj(rfft2(m1, -1)) * rfft2(m2, -1)
+    return irfft2(cross, m1.shape[-1], -1) / size
 
 if __name__ == "__main__":
     for i, file in enumerate(txt_list()):
@@ -67,19 +69,12 @@ if __name__ == "__main__":
         plt.savefig(f"hw7/figs/{lattice_size}_{i}.png")
         pass
 
-    corr_matrix_mean = np.zeros((lattice_size, lattice_size))
-    matrix_A_mean = np.zeros((lattice_size, lattice_size))
-    matrix_B_mean = np.zeros((lattice_size, lattice_size))
-    for i, lattice in enumerate(lattice_list):
-        if np.sum(lattice) != 0:
-            raise ValueError("lattice is not balanced")
-        # matrix_A_mean += lattice[:, ::2]
-        # matrix_B_mean += lattice[:, 1::2]
-        matrix_A = lattice[:, ::2]
-        matrix_B = lattice[:, 1::2]
-        corr_matrix = corr_func(matrix_A, matrix_B)
-        corr_matrix_mean += corr_matrix
-    corr_matrix_mean /= len(lattice_list)
+    lattices = np.array(lattice_list)
+    if np.any(np.sum(lattices, axis=(1, 2)) != 0):
+        raise ValueError("lattice is not balanced")
+    matrix_A = lattices[:, :, ::2]
+    matrix_B = lattices[:, :, 1::2]
+    corr_matrix_mean = corr_func(matrix_A, matrix_B).mean(axis=0)
 
     plt.figure()
     plt.imshow(corr_matrix_mean, cmap='RdBu', vmin=-1, vmax=1, origin='lower',